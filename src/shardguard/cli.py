@@ -2,15 +2,11 @@
 
 import asyncio
 import os
-from contextlib import asynccontextmanager
+import sys
+from contextlib import AsyncExitStack, asynccontextmanager
+from functools import lru_cache
 
 import typer
-from rich.console import Console
-
-from shardguard.core.coordination import CoordinationService
-from shardguard.core.planning import PlanningLLM
-from shardguard.core.schemas import PLANNING_LLM_SCHEMA
-from shardguard.utils.validator import _validate_output
 
 
 # Load environment variables from .env file
@@ -24,14 +20,43 @@ except ImportError:
 import traceback
 
 app = typer.Typer(help="ShardGuard CLI")
-console = Console()
+
+
+@lru_cache(maxsize=1)
+def _console():
+    """Return the shared Rich console, created on first use."""
+    from rich.console import Console
+
+    return Console()
+
+
+def _loop_factory():
+    """Return uvloop's event loop factory when it is installed."""
+    if sys.platform == "win32":
+        return None
+    try:
+        import uvloop
+    except ImportError:
+        return None
+    return uvloop.new_event_loop
+
+
+def _run(coro):
+    """Run a coroutine to completion with eager task execution enabled."""
+    with asyncio.Runner(loop_factory=_loop_factory()) as runner:
+        runner.get_loop().set_task_factory(asyncio.eager_task_factory)
+        return runner.run(coro)
 
 
 def _count_tools_and_servers(tools_description: str) -> tuple[int, int]:
     """Count tools and servers from tools description."""
-    lines = tools_description.split("\n")
-    tool_count = len([line for line in lines if line.strip().startswith("•")])
-    server_count = len([line for line in lines if line.strip().startswith("Server:")])
+    tool_count = server_count = 0
+    for line in tools_description.splitlines():
+        stripped_line = line.lstrip()
+        if stripped_line.startswith("•"):
+            tool_count += 1
+        elif stripped_line.startswith("Server:"):
+            server_count += 1
     return tool_count, server_count
 
 
@@ -43,56 +68,80 @@ async def create_planner(
     api_key: str | None = None,
 ):
     """Create and manage a PlanningLLM instance with proper cleanup."""
-    console.print(f"[dim]🔌 Initializing {provider_type} provider...[/dim]")
+    from shardguard.core.planning import PlanningLLM
+
+    _console().print(f"[dim]🔌 Initializing {provider_type} provider...[/dim]")
 
     planner = PlanningLLM(
         provider_type=provider_type, model=model, base_url=base_url, api_key=api_key
     )
 
+    async with AsyncExitStack() as stack:
+        # Registered first so the planner is closed however the command exits
+        stack.push_async_callback(planner.aclose)
+
+        # Connect in the background so the command can start printing right away.
+        # Commands that need the tools description share this in-flight fetch
+        # through the planner's cache.
+        probe = asyncio.create_task(_report_mcp_status(planner))
+        stack.push_async_callback(asyncio.wait, [probe])
+
+        # Errors raised by the command itself propagate to the caller
+        yield planner
+
+
+async def _report_mcp_status(planner) -> None:
+    """Test connectivity by checking tools and report the outcome."""
     try:
-        # Test connectivity by checking tools
         tools_description = await planner.get_available_tools_description()
         if "No MCP tools available." not in tools_description:
             tool_count, server_count = _count_tools_and_servers(tools_description)
-            console.print(
+            _console().print(
                 f"[dim]✅ Connected to {server_count} servers with {tool_count} tools[/dim]"
             )
         else:
-            console.print("[dim]⚠️  No MCP tools available[/dim]")
-
-        yield planner
-
+            _console().print("[dim]⚠️  No MCP tools available[/dim]")
     except Exception as e:
-        console.print(f"[dim]⚠️  MCP connection issue: {e}[/dim]")
-        console.print(f"[dim]{traceback.format_exc()}[/dim]")
-        yield planner
-    finally:
-        planner.close()
+        _console().print(f"[dim]⚠️  MCP connection issue: {e}[/dim]")
+        _console().print(f"[dim]{traceback.format_exc()}[/dim]")
 
 
 def _validate_gemini_api_key(provider: str, api_key: str | None) -> None:
     """Validate Gemini API key if required."""
     if provider == "gemini" and not api_key:
-        console.print(
+        _console().print(
             "[bold red]Error:[/bold red] Gemini API key required. "
             "Set GEMINI_API_KEY env var or use --gemini-api-key"
         )
         raise typer.Exit(1)
 
 
+_DEFAULT_MODELS = {"gemini": "gemini-2.0-flash-exp", "ollama": "llama3.2"}
+
+_PROVIDER_FMT = {
+    "ollama": "[dim]Using Ollama model: {model} at {url}[/dim]",
+    "gemini": "[dim]Using Gemini model: {model}[/dim]",
+}
+
+_CONNECTION_HINTS = {
+    "ollama": "Make sure Ollama is running: `ollama serve`",
+    "gemini": "Check your Gemini API key and internet connection",
+}
+_MCP_CONNECTION_HINT = "Check that the MCP server starts and stays running; the tool call may have been applied"
+
+
+@lru_cache(maxsize=8)
 def _get_model_for_provider(provider: str, model: str | None) -> str:
     """Get the model name for the provider, auto-detecting if not specified."""
     if model is not None:
         return model
-    return "gemini-2.0-flash-exp" if provider == "gemini" else "llama3.2"
+    return _DEFAULT_MODELS.get(provider, "llama3.2")
 
 
 def _print_provider_info(provider: str, model: str, ollama_url: str) -> None:
     """Print information about the selected provider and model."""
-    if provider == "ollama":
-        console.print(f"[dim]Using Ollama model: {model} at {ollama_url}[/dim]")
-    else:
-        console.print(f"[dim]Using Gemini model: {model}[/dim]")
+    fmt = _PROVIDER_FMT.get(provider, _PROVIDER_FMT["gemini"])
+    _console().print(fmt.format(model=model, url=ollama_url))
 
 
 def _print_tools_info(tools_description: str, verbose: bool = False) -> None:
@@ -101,40 +150,43 @@ def _print_tools_info(tools_description: str, verbose: bool = False) -> None:
         return
 
     if verbose:
-        console.print("[bold blue]MCP Servers & Tools:[/bold blue]")
+        _console().print("[bold blue]MCP Servers & Tools:[/bold blue]")
         _print_verbose_tools_info(tools_description)
     else:
         tool_count, server_count = _count_tools_and_servers(tools_description)
-        console.print(
+        _console().print(
             f"[dim]Available tools: {tool_count} tools from {server_count} servers[/dim]"
         )
 
 
 def _print_verbose_tools_info(tools_description: str) -> None:
     """Print detailed server and tool information."""
-    for line in tools_description.split("\n"):
+    for line in tools_description.splitlines():
         stripped_line = line.strip()
         if stripped_line.startswith("Server:"):
             server_name = stripped_line.replace("Server:", "").strip()
-            console.print(f"[bold cyan]{server_name}[/bold cyan]")
+            _console().print(f"[bold cyan]{server_name}[/bold cyan]")
         elif stripped_line.startswith("•"):
             tool_name = stripped_line.replace("•", "").strip()
             if ":" in tool_name:
                 tool_name = tool_name.split(":")[0]
-            console.print(f"  └── [green]{tool_name}[/green]")
-    console.print()
+            _console().print(f"  └── [green]{tool_name}[/green]")
+    _console().print()
 
 
 def _handle_errors(e: Exception, provider: str) -> None:
     """Handle and display errors appropriately."""
-    if isinstance(e, ConnectionError):
-        console.print(f"[bold red]Connection Error:[/bold red] {e}")
-        if provider == "ollama":
-            console.print("Make sure Ollama is running: `ollama serve`")
-        else:
-            console.print("Check your Gemini API key and internet connection")
+    from shardguard.core.mcp_integration import MCPConnectionError
+
+    # Checked first: a lost MCP server is a ConnectionError too, but not the LLM provider's
+    if isinstance(e, MCPConnectionError):
+        _console().print(f"[bold red]MCP Server Error:[/bold red] {e}")
+        _console().print(_MCP_CONNECTION_HINT)
+    elif isinstance(e, ConnectionError):
+        _console().print(f"[bold red]Connection Error:[/bold red] {e}")
+        _console().print(_CONNECTION_HINTS.get(provider, _CONNECTION_HINTS["gemini"]))
     else:
-        console.print(f"[bold red]Error:[/bold red] {e}")
+        _console().print(f"[bold red]Error:[/bold red] {e}")
     raise typer.Exit(1)
 
 
@@ -180,10 +232,10 @@ def list_tools(
             if verbose:
                 _print_verbose_tools_info(tools_description)
             else:
-                console.print("[bold blue]Available MCP Tools:[/bold blue]")
-                console.print(tools_description)
+                _console().print("[bold blue]Available MCP Tools:[/bold blue]")
+                _console().print(tools_description)
 
-    asyncio.run(_list_tools())
+    _run(_list_tools())
 
 
 @app.command()
@@ -199,6 +251,12 @@ def plan(
     """Generate a safe execution plan for a user prompt, then execute its subtasks."""
 
     async def _plan():
+        from shardguard.core.coordination import CoordinationService
+        from shardguard.core.execution import aclose_execution_llms
+        from shardguard.core.schemas import PLANNING_LLM_SCHEMA
+        from shardguard.utils.serialization import dumps
+        from shardguard.utils.validator import _validate_output
+
         try:
             api_key = gemini_api_key or os.getenv("GEMINI_API_KEY")
             _validate_gemini_api_key(provider, api_key)
@@ -212,21 +270,26 @@ def plan(
                 tools_description = await planner.get_available_tools_description()
                 _print_tools_info(tools_description, verbose)
 
-                coord = CoordinationService(planner)
-                plan_obj = await coord.handle_prompt(prompt)
-                typer.echo(plan_obj.model_dump_json(indent=2))
-                # Validating the Planning Object Schema for making the model more deterministic
-                _validate_output(plan_obj.model_dump(exclude_none=True), PLANNING_LLM_SCHEMA, where="Planning")
-                # Sending the sub prompts generated by the LLM to be processed and executed
-                if langchain:
-                    await coord.handle_subtasks_langchain(plan_obj.sub_prompts, provider, detected_model, api_key)
-                else:
-                    await coord.handle_subtasks(plan_obj.sub_prompts, provider, detected_model, api_key)
+                async with CoordinationService(planner) as coord:
+                    plan_obj = await coord.handle_prompt(prompt)
+                    if plan_obj is None:
+                        raise ValueError("No plan produced: the Planning LLM never suggested only available tools")
+                    typer.echo(dumps(plan_obj.model_dump(mode="json"), indent=True))
+                    # Validating the Planning Object Schema for making the model more deterministic
+                    _validate_output(plan_obj.model_dump(exclude_none=True), PLANNING_LLM_SCHEMA, where="Planning")
+                    # Sending the sub prompts generated by the LLM to be processed and executed
+                    if langchain:
+                        await coord.handle_subtasks_langchain(plan_obj.sub_prompts, provider, detected_model, api_key)
+                    else:
+                        await coord.handle_subtasks(plan_obj.sub_prompts, provider, detected_model, api_key)
 
         except Exception as e:
             _handle_errors(e, provider)
+        finally:
+            # Execution LLMs are shared process-wide; their clients belong to this run's loop
+            await aclose_execution_llms()
 
-    asyncio.run(_plan())
+    _run(_plan())
 
 
 @app.callback(invoke_without_command=True)
@@ -238,20 +301,18 @@ def main(
     if ctx.invoked_subcommand is None:
 
         async def _init():
-            console.print("🛡️  [bold blue]Welcome to ShardGuard![/bold blue]")
+            _console().print("🛡️  [bold blue]Welcome to ShardGuard![/bold blue]")
             async with create_planner() as planner:
                 if verbose:
                     tools_description = await planner.get_available_tools_description()
                     _print_verbose_tools_info(tools_description)
 
-            console.print("\n[dim]Use --help to see available commands.[/dim]")
-            console.print("[dim]Available commands: list-tools, plan[/dim]")
-            console.print("[dim]Supported providers: ollama (default), gemini[/dim]")
-            console.print(
-                "[dim]For Gemini: Set GEMINI_API_KEY environment variable[/dim]"
-            )
+            _console().print("\n[dim]Use --help to see available commands.[/dim]")
+            _console().print("[dim]Available commands: list-tools, plan[/dim]")
+            _console().print("[dim]Supported providers: ollama (default), gemini[/dim]")
+            _console().print("[dim]For Gemini: Set GEMINI_API_KEY environment variable[/dim]")
 
-        asyncio.run(_init())
+        _run(_init())
 
 
 if __name__ == "__main__":
@@ -5,33 +5,164 @@ from here and comes back here to be further processed. This is because we
 trust that the coordination service is the trusted source for ShardGuard.
 """
 
+import asyncio
+import logging
+import re
+import time
+from collections.abc import Callable, Mapping
+from dataclasses import asdict, is_dataclass
+from functools import lru_cache, partial
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from pydantic import TypeAdapter, ValidationError
 from rich.console import Console
-from dataclasses import is_dataclass, asdict
-from typing import Any, Dict, Mapping, Optional
 
-from shardguard.core.models import Plan
+from shardguard.core.execution import (
+    LLMStepResponse,
+    StepExecutor,
+    ToolCall,
+    make_execution_llm,
+)
+from shardguard.core.llm_providers import FallbackResponse
+from shardguard.core.mcp_integration import MCPClient
+from shardguard.core.models import Plan, SubPrompt
+from shardguard.core.plan_cache import InMemoryPlanCache, PlanCache, plan_cache_key
 from shardguard.core.planning import PlanningLLM
 from shardguard.core.prompts import PLANNING_PROMPT
-from shardguard.core.execution import StepExecutor, LLMStepResponse, make_execution_llm, ToolCall
-from shardguard.core.execution_langchain import *
-from shardguard.core.mcp_integration import MCPClient
-from shardguard.utils.validator import _validate_output
 from shardguard.utils.redaction import Redactor
-
-import logging
+from shardguard.utils.validator import _validate_output
 
 logger = logging.getLogger(__name__)
 
+# How long the set of available tool names is trusted before MCP is asked again
+TOOL_NAMES_TTL = 60.0
+
+# Planning LLM retries when a plan suggests unknown tools, and the first backoff delay in seconds
+MAX_PLAN_RETRIES = 5
+PLAN_RETRY_BACKOFF = 0.1
+
+# PLANNING_PROMPT has a single field; resolve its {{ }} escapes once and keep
+# the text around the placeholder so each request is a plain concatenation.
+_PROMPT_PREFIX, _PROMPT_SUFFIX = PLANNING_PROMPT.format(
+    user_prompt="{user_prompt}"
+).split("{user_prompt}", 1)
+
+# Redaction rules ship inside the package, so they are found whatever the working directory is
+RULES_FILE = Path(__file__).resolve().parent.parent / "utils" / "rules.yaml"
+
+
+@lru_cache(maxsize=1)
+def _load_redactor(path: Path = RULES_FILE) -> Redactor:
+    """Redactor with the rules parsed and compiled once per process."""
+    return Redactor(str(path), strategy="pseudonymize")
+
+
+@lru_cache(maxsize=1)
+def _plan_adapter() -> TypeAdapter[Plan]:
+    """Plan validator, built on first use and reused for every prompt."""
+    return TypeAdapter(Plan)
+
+
+def _identity(obj: Any) -> Any:
+    return obj
+
+
+def _suggested_tool_call(name: str, result: Any) -> ToolCall:
+    """Build the ToolCall carrying an agent result for a "server.tool" name suggested by the Planning LLM"""
+    server, _, tool = name.partition(".")
+    return ToolCall(server=server, tool=tool, args={"result": result})
+
+
+async def _run_concurrently(coros) -> None:
+    """Run coroutines as tasks; on the first failure cancel the rest and wait for them before re-raising."""
+    tasks = [asyncio.create_task(coro) for coro in coros]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        # No task is left running, or failing, after its command has ended
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def _record_and_replace(found: Mapping[str, str], opaque: dict[str, str], m: re.Match) -> str:
+    """Return the pseudonym for a matched value, recording it in the subprompt's opaque values."""
+    text = m.group(0)
+    opaque[text] = found[text]
+    return found[text]
+
+
+def _vars_dict(obj: Any) -> dict[str, Any]:
+    return dict(vars(obj))
+
+
+@lru_cache(maxsize=64)
+def _converter(tp: type) -> Callable[[Any], dict[str, Any]]:
+    """Pick the dict conversion for a step type; introspects each type only once."""
+    if issubclass(tp, dict):
+        return _identity
+    if is_dataclass(tp):
+        return asdict
+    # Added this as most of the tool objects are being referenced as Sharguard Model Schema
+    if callable(getattr(tp, "model_dump", None)):
+        return tp.model_dump    # Pydantic v2
+    if callable(getattr(tp, "dict", None)):
+        return tp.dict          # Pydantic v1
+    if issubclass(tp, Mapping):
+        return dict
+    if getattr(tp, "__dictoffset__", 0):
+        return _vars_dict
+    raise TypeError(f"Unsupported step type: {tp!r}. Provide a dict-like object.")
+
+
 class CoordinationService:
     """Coordination service for planning."""
 
-    def __init__(self, planner: PlanningLLM):
+    def __init__(
+        self,
+        planner: PlanningLLM,
+        max_concurrency: int = 4,
+        plan_cache: PlanCache | None = None,
+        strict_tool_check: bool = False,
+        mcp_client: MCPClient | None = None,
+    ):
         self.planner = planner
+        # Tool calls go through the given client, else the planner's, so both share one set of
+        # server sessions; only a client the service had to open itself is closed by aclose
+        shared_client = mcp_client if mcp_client is not None else getattr(planner, "mcp_client", None)
+        self._owns_mcp_client = shared_client is None
+        self.mcp_client = shared_client if shared_client is not None else MCPClient()
+        # When set, plans suggesting unknown tools are regenerated; otherwise unknown tools are skipped at execution time
+        self.strict_tool_check = strict_tool_check
+        # Plans that passed validation, keyed by model and user prompt; pass another PlanCache to share or persist them
+        self.plan_cache = plan_cache if plan_cache is not None else InMemoryPlanCache()
         self.console = Console()
         # Saving all the args (opaque values) from the prompt into this dictionary 
         self.args: Dict[str, Any] = {}
-        self.retryCount = 1     #Keeping the retrycount of the PlanningLLM to not overburden the system and make it keep on be in an infinite loop
-        self.redactor = Redactor("./src/shardguard/utils/rules.yaml", strategy="pseudonymize")
+        self.redactor = _load_redactor()
+        # (tool names, monotonic time they were fetched), shared by every check_tool call
+        self._tool_names_cache: tuple[frozenset[str], float] | None = None
+        self._tool_names_lock = asyncio.Lock()
+        # Caps how many subtasks talk to the Execution LLM at once, to stay within provider rate limits
+        self._task_slots = asyncio.Semaphore(max_concurrency)
+
+    def _mcp_client(self) -> MCPClient:
+        """Return the MCP client that tool listings and tool calls go through."""
+        return self.mcp_client
+
+    async def aclose(self):
+        """Close the MCP client if the service opened it; a shared client is left to its owner."""
+        if self._owns_mcp_client:
+            await self.mcp_client.aclose()
+
+    async def __aenter__(self):
+        """Async context manager entry."""
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        """Async context manager exit."""
+        await self.aclose()
 
     def _to_dict(self, obj: Any) -> Dict[str, Any]:
         """
@@ -44,80 +175,112 @@ class CoordinationService:
         the future and some other datatype comes in, we would not have to 
         make changes again to this.
         """
-        if isinstance(obj, dict):
+        if type(obj) is dict:
             return obj
-        if is_dataclass(obj):
-            return asdict(obj)
-        # Added this as most of the tool objects are being referenced as Sharguard Model Schema
-        if hasattr(obj, "model_dump") and callable(obj.model_dump): 
-            return obj.model_dump()  # Pydantic v2
-        if hasattr(obj, "dict") and callable(obj.dict):
-            return obj.dict()        # Pydantic v1
-        if isinstance(obj, Mapping):
-            return dict(obj)
-        if hasattr(obj, "__dict__"):
-            return dict(vars(obj))
-        raise TypeError(f"Unsupported step type: {type(obj)!r}. Provide a dict-like object.")
+        return _converter(type(obj))(obj)
     
+    async def _get_tool_names(self) -> frozenset[str]:
+        """Return the "server.tool" names available over MCP, cached for TOOL_NAMES_TTL seconds."""
+        # Concurrent checks wait for a single listing instead of each starting their own
+        async with self._tool_names_lock:
+            cached = self._tool_names_cache
+            if cached is not None and time.monotonic() - cached[1] < TOOL_NAMES_TTL:
+                return cached[0]
+            names = frozenset(await self._mcp_client().list_tool_names())
+            self._tool_names_cache = (names, time.monotonic())
+            return names
+
     async def check_tool(self, suggested_tools) -> bool:
         """Check whether the Planning LLM gave the tools only from those present with us and not hallucinate"""
-        mcp = MCPClient()
-        tools = await mcp.list_tool_names()
-        # Check on the length of suggested tools if there exist for the subprompt then only validate that the tool exist in the system, else return true and let it pass
-        if (len(suggested_tools)!=0):
-            for tool in suggested_tools:
-                if tool in tools:
-                    return True
-                else:
-                    return False
-        return True
-
-    async def handle_prompt(self, user_input: str) -> Plan:
+        # Subprompts without suggested tools have nothing to validate and are let through
+        if not suggested_tools:
+            return True
+        return (await self._get_tool_names()).issuperset(suggested_tools)
+
+    async def handle_prompt(self, user_input: str) -> Plan | None:
         """Prepare the prompt by adding predefined context to design the plan of execution"""
+        cache_key = self._plan_cache_key(user_input)
+        cached_plan = await self.plan_cache.get(cache_key)
+        if cached_plan is not None:
+            try:
+                return _plan_adapter().validate_json(cached_plan)
+            except ValidationError:
+                # A stale or corrupt entry is replanned and overwritten below
+                logger.warning("Ignoring cached plan that no longer validates")
+
         formatted_prompt = self._format_prompt(user_input)
-        plan_json = await self.planner.generate_plan(formatted_prompt)
-
-        plan_dict = Plan.model_validate_json(plan_json).model_dump(exclude_none=True)
-
-        # redactor
-        for sub in plan_dict.get("sub_prompts", []):
-            opaque = sub.get("opaque_values") or {}
-
-            content = sub.get("content", "")
-            for match_rule in self.redactor.rules:
-                kind = match_rule["kind"]
-                pattern = match_rule["pattern"]
-                for m in pattern.findall(content):
-                    opaque[m] = self.redactor._replace(kind, m)
-
-            sub["opaque_values"] = opaque
-
-        import json
-        plan_json = json.dumps(plan_dict)
-
-        # Set the plan to a valid json for processing
-        plan_tool_check = Plan.model_validate_json(plan_json).model_dump(exclude_none=True)
-        # Looping into subprompts to get suggested tools, and check the tool exists in the system before execution starts
-        tool_check = [] # this is an array as we want all the Sub Prompts to have the tools only existing in the system
-        for items in plan_tool_check["sub_prompts"]:
-            tool_check.append(await self.check_tool(items["suggested_tools"]))
-        
-        # Validating if all are True in the array, else PlanningLLM is re-executed
-        if(not(False in tool_check)):
-            return Plan.model_validate_json(plan_json)
-        else:
-            # Keeping the retry count to a maximum of 5
-            if(self.retryCount<=5):
-                self.retryCount+=1
-                logger.warning(f"Retrying Planning LLM due to invalid tool suggestion!")
-                await self.handle_prompt(user_input)
-            else:
-                logger.error("Planning LLM failed to generate plan with tools for all subprompts!\n\n\t\tOR\n\nTools for a specific task does not exist!")
-        return
+        # The first attempt plus up to MAX_PLAN_RETRIES retries, so the PlanningLLM is not kept in an infinite loop
+        for attempt in range(MAX_PLAN_RETRIES + 1):
+            if attempt:
+                logger.warning("Retrying Planning LLM due to invalid tool suggestion!")
+                await asyncio.sleep(PLAN_RETRY_BACKOFF * 2 ** (attempt - 1))
+
+            plan_json = await self.planner.generate_plan(formatted_prompt)
+
+            # Parsed once; redaction and the tool check both work on the validated objects
+            plan = _plan_adapter().validate_json(plan_json)
+
+            # redactor
+            for sub in plan.sub_prompts:
+                self._redact_subprompt(sub)
+
+            if self.strict_tool_check:
+                # Looping into subprompts to get suggested tools, and check the tool exists in the system before execution starts
+                # All the Sub Prompts must have only tools existing in the system, so they are checked together
+                tool_check = await asyncio.gather(
+                    *(self.check_tool(sub.suggested_tools) for sub in plan.sub_prompts)
+                )
+                # Validating if all are True, else PlanningLLM is re-executed
+                if not all(tool_check):
+                    continue
+
+            # Only plans the model actually produced and that passed every check are cached, so
+            # neither a bad plan nor the stand-in for a failed call is ever replayed.
+            # Opaque values are the raw sensitive data, so those plans never reach a persistent cache.
+            if isinstance(plan_json, FallbackResponse):
+                logger.warning("Not caching the fallback plan from a failed Planning LLM call")
+            elif not (self.plan_cache.persistent and any(sub.opaque_values for sub in plan.sub_prompts)):
+                await self.plan_cache.set(cache_key, plan.model_dump_json())
+            return plan
+
+        logger.error("Planning LLM failed to generate plan with tools for all subprompts!\n\n\t\tOR\n\nTools for a specific task does not exist!")
+        return None
+
+    async def forget_plan(self, user_input: str) -> None:
+        """Evict the cached plan for a user prompt, so the next request asks the Planning LLM again."""
+        await self.plan_cache.delete(self._plan_cache_key(user_input))
+
+    def _plan_cache_key(self, user_input: str) -> str:
+        # Planners only need generate_plan, so model and endpoint are optional and may be any object
+        return plan_cache_key(
+            str(getattr(self.planner, "model", "")), user_input, str(getattr(self.planner, "base_url", ""))
+        )
+
+    def _redact_subprompt(self, sub: SubPrompt) -> None:
+        """Swap sensitive values in a subprompt's content for pseudonyms, recording each in its opaque values."""
+        # One scan with every rule combined rules out content with nothing to redact
+        if not self.redactor.may_match(sub.content):
+            return
+        opaque = sub.opaque_values
+
+        # Every rule scans the original content, so inserted replacements are never rescanned
+        found: dict[str, str] = {}
+        for match_rule in self.redactor.rules:
+            kind = match_rule["kind"]
+            for m in match_rule["pattern"].finditer(sub.content):
+                text = m.group(0)
+                if text not in found:
+                    found[text] = opaque[text] if text in opaque else self.redactor._replace(kind, text)
+        if not found:
+            return
+
+        # Then one scan swaps them all out; longest first so no value is shadowed by its own prefix
+        combined = re.compile("|".join(map(re.escape, sorted(found, key=len, reverse=True))))
+        sub.content = combined.sub(partial(_record_and_replace, found, opaque), sub.content)
 
     def _format_prompt(self, user_input: str) -> str:
         """Format the user input using the planning prompt template."""
-        return PLANNING_PROMPT.format(user_prompt=user_input)
+        return f"{_PROMPT_PREFIX}{user_input}{_PROMPT_SUFFIX}"
     
     def extract_arguments(self, task):
         """
@@ -140,57 +303,99 @@ class CoordinationService:
         and this tool call schema is also validated to make the responses from the LLM
         as deterministic as possible.
         """
-        mcp = MCPClient()
+        mcp = self._mcp_client()
         output_schema: Optional[Dict[str, Any]] = step.get("output_schema")
 
+        # Tools are validated just in time; calls to tools that do not exist are skipped rather than replanned
+        tool_names = await self._get_tool_names()
+        known_calls = []
         for call in resp.tool_calls:
-            # Build per-call args
-            per_tool_args: Dict[str, Any] = {}
-            if call.args:
-                per_tool_args.update(call.args)
+            if f"{call.server}.{call.tool}" in tool_names:
+                known_calls.append(call)
+            else:
+                logger.warning("Skipping unknown tool %s.%s suggested by the Execution LLM", call.server, call.tool)
+
+        # One batch per server, all servers dispatched concurrently
+        calls = [(call, dict(call.args or {})) for call in known_calls]
+        results = await mcp.call_tools(
+            [(call.server, call.tool, per_tool_args) for call, per_tool_args in calls]
+        )
 
-            result = await mcp.call_tool(call.server, call.tool, per_tool_args)
+        for (call, per_tool_args), result in zip(calls, results, strict=True):
             # Validating the result from the tool call with the expected schema
             _validate_output(result, output_schema, where="Tool Call")
 
-            logger.warning(f"{call.server}: {call.tool} was called with the parameters: {per_tool_args}")
-    
-    async def handle_subtasks(self, tasks, provider, detected_model, api_key):
-        """Sends the subtasks to ExecutionLLM"""
-        for task in tasks:
-            # Instantiating a new ExecutionLLM for each task so that none of them have each others context
-            exec_llm = make_execution_llm(provider, detected_model, api_key=api_key)
+            logger.warning("%s: %s was called with the parameters: %s", call.server, call.tool, per_tool_args)
+
+    async def _propose_step(self, task, exec_llm):
+        """Runs a single subtask through the ExecutionLLM and returns it with its proposed tool calls"""
+        async with self._task_slots:
             executor = StepExecutor(exec_llm)
             task = self._to_dict(task)
             argument_dicts = self.extract_arguments(task)
             task["opaque_values"] = argument_dicts
             # Sends the task to process for execution
-            resp = await executor.run_step(task)
-            await self._execute_step_tools(task, resp)
+            return task, await executor.run_step(task)
+
+    async def _run_step(self, task, exec_llm):
+        """Runs a single subtask through the ExecutionLLM, then executes its tool calls"""
+        task, resp = await self._propose_step(task, exec_llm)
+        await self._execute_step_tools(task, resp)
+
+    async def handle_subtasks(self, tasks, provider, detected_model, api_key):
+        """
+        Sends the subtasks to ExecutionLLM, executing each one's tools as soon as it is ready.
+        Subtasks run concurrently, so their tools are called in completion order, not plan order.
+        If one fails, the others are cancelled and the error is raised.
+        """
+        # One shared client for every task: each step is sent as a standalone prompt, so no task sees another's context
+        exec_llm = make_execution_llm(provider, detected_model, api_key=api_key)
+        # Tool execution of finished steps overlaps with the Execution LLM calls still in flight
+        await _run_concurrently(self._run_step(task, exec_llm) for task in tasks)
         return
 
     async def handle_subtasks_langchain(self, tasks, provider, detected_model, api_key):
-        """Sends subtasks to a fully self-contained LangChain agent"""
-        for task in tasks:
+        """Sends subtasks to fully self-contained LangChain agents, running them concurrently"""
+        # One shared client for every agent: each step is sent as a standalone prompt, so no task sees another's context
+        exec_llm = make_execution_llm(provider, detected_model, api_key=api_key)
+        await _run_concurrently(self._run_one_langchain(task, exec_llm) for task in tasks)
+        return
+
+    async def _run_one_langchain(self, task, exec_llm):
+        """Runs a single subtask through its own LangChain agent and executes the resulting tool calls"""
+        # LangChain is heavy to import and only this path needs it
+        from shardguard.core.execution_langchain import (
+            GenericExecutionLLMWrapper,
+            ToolsWrapper,
+            make_execution_agent,
+        )
+
+        async with self._task_slots:
             task_dict = self._to_dict(task)
             argument_dicts = self.extract_arguments(task_dict)
             task_dict["opaque_values"] = argument_dicts
-            # Create the execution LLM
-            exec_llm = make_execution_llm(provider, detected_model, api_key=api_key)
-            if len(task_dict["suggested_tools"])<1:
+            suggested_tools = task_dict["suggested_tools"]
+            # Without a suggested tool the step has nothing to execute, as with an agent given no tools
+            if not suggested_tools:
+                logger.debug("Subtask %s suggests no tools; nothing to execute", task_dict.get("id"))
+            # With one tool there is nothing for an agent to choose, so a single Execution LLM
+            # call fills in its arguments; calls to any other tool it proposes are dropped
+            elif len(suggested_tools) == 1:
                 executor = StepExecutor(exec_llm)
-                task = self._to_dict(task)
-                argument_dicts = self.extract_arguments(task)
-                task["opaque_values"] = argument_dicts
                 # Sends the task to process for execution
-                resp = await executor.run_step(task)
-                await self._execute_step_tools(task, resp)
-            
+                resp = await executor.run_step(task_dict)
+                allowed = [
+                    call for call in resp.tool_calls if f"{call.server}.{call.tool}" in suggested_tools
+                ]
+                if len(allowed) < len(resp.tool_calls):
+                    logger.warning("Dropping tool calls outside %s proposed by the Execution LLM", suggested_tools)
+                await self._execute_step_tools(task_dict, LLMStepResponse(tool_calls=allowed))
+
             else:
                 # Create agent (tool wrapper)
                 agent = make_execution_agent(
                     GenericExecutionLLMWrapper(exec_llm),
-                    suggested_tools=ToolsWrapper(task_dict["suggested_tools"])
+                    suggested_tools=ToolsWrapper(suggested_tools)
                 )
                 # Prepare the task input string
                 task_input = task_dict.get("content", "")
@@ -198,14 +403,8 @@ class CoordinationService:
                     task_input += f"\nOpaque Values: {task_dict['opaque_values']}"
                 result = await agent.ainvoke(task_input)
                 # Wrap result in LLMStepResponse
-                resp = []
-                for x in task_dict["suggested_tools"]:
-                    resp.append(
-                            ToolCall(server=x.split('.')[0], tool=x.split('.')[-1], args={"result": result})
-                        )
                 resp = LLMStepResponse(
-                                tool_calls=resp
-                        )
+                    tool_calls=[_suggested_tool_call(name, result) for name in suggested_tools]
+                )
                 # Execute the step tools (already async)
                 await self._execute_step_tools(task_dict, resp)
-        return
\ No newline at end of file
@@ -2,28 +2,46 @@
 
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
 import re
+import sys
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
 
-from jsonschema import validate as jsonschema_validate
+from jsonschema import Draft202012Validator
 from abc import ABC, abstractmethod
 
 from shardguard.core.schemas import TOOL_INTENTS_SCHEMA
 from shardguard.core.llm_providers import create_provider
+from shardguard.utils.serialization import dumps, loads
+
+if TYPE_CHECKING:
+    import httpx
 
 logger = logging.getLogger(__name__)
 
-@dataclass
+# Built once; jsonschema.validate would check the schema and build a validator on every call
+Draft202012Validator.check_schema(TOOL_INTENTS_SCHEMA)
+_INTENTS_VALIDATOR = Draft202012Validator(TOOL_INTENTS_SCHEMA)
+_INTENT_ITEM_VALIDATOR = Draft202012Validator(TOOL_INTENTS_SCHEMA["items"])
+
+# First JSON array of objects embedded in free text, and the markdown fences models wrap JSON in.
+# The body cannot cross another bracket, so each "[" scans only up to the next one and matching
+# stays linear on prose full of brackets; arrays nesting lists are left to the slice fallback.
+_JSON_ARRAY_RE = re.compile(r"\[\s*\{[^\[\]]*\}\s*\]")
+_FENCE_RE = re.compile(r"```(?:json)?")
+
+@dataclass(slots=True, frozen=True)
 class ToolCall:
     """Represents a tool call proposal for safe execution."""
     server: str
     tool: str
     args: Optional[Dict[str, Any]] = None
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class LLMStepResponse:
     """Response for a single execution step containing proposed tool calls."""
     tool_calls: List[ToolCall]
@@ -85,43 +103,92 @@ If any verification step fails, correct internally and regenerate until all chec
 
 '''
 
+# The system prompt never changes, so it is joined to its separator once
+_EXEC_PROMPT_HEAD = f"{EXEC_SYSTEM_PROMPT}\n\n"
+
 def _build_exec_prompt(task: str, suggested_tools: list) -> str:
     """Builds a consistent JSON-based prompt for all execution providers."""
+    try:
+        return _build_exec_prompt_cached(task or "", tuple(suggested_tools or ()))
+    except TypeError:
+        # Entries that cannot key the cache, such as dict tool specs, are rendered uncached
+        return _render_exec_prompt(task or "", suggested_tools)
+
+@lru_cache(maxsize=256)
+def _build_exec_prompt_cached(task: str, tools_key: tuple) -> str:
+    """Prompt text for one (task, tools) pair; steps repeating both reuse the same string."""
+    return _render_exec_prompt(task, list(tools_key))
 
+def _render_exec_prompt(task: str, suggested_tools) -> str:
     return (
-        f"{EXEC_SYSTEM_PROMPT}\n\n"
-        f"Task:\n{task or ''}\n\n"
+        f"{_EXEC_PROMPT_HEAD}"
+        f"Task:\n{task}\n\n"
         f"Suggested Tools: {suggested_tools or []}"
         "Return ONLY a JSON array (no prose)."
     )
 
+def _valid_intents(items: list) -> list[dict[str, Any]]:
+    """Keep the items that satisfy the intent schema; one bad item does not sink the rest."""
+    valid = [item for item in items if _INTENT_ITEM_VALIDATOR.is_valid(item)]
+    if len(valid) != len(items):
+        logger.warning("Dropped %d tool intent(s) that do not match the schema", len(items) - len(valid))
+    return valid
+
 def _extract_json_array(text: str) -> List[Dict[str, Any]]:
     """
-    Parse and validate a JSON array from LLM output.
+    Parse a JSON array from LLM output and keep its schema-valid intents.
     Falls back to regex extraction if model includes extra text.
     """
     if not isinstance(text, str):
         raise ValueError("Execution LLM returned non-string content.")
     
-    try:
-        obj = json.loads(text.replace("```json","").replace("```",""))     # Added a condition to replace the ```json ``` format to normal json for parsing purposes
-        if isinstance(obj, list):
-            jsonschema_validate(obj, TOOL_INTENTS_SCHEMA)
-            return obj
-    except Exception:
-        pass
-
-    match = re.search(r"\[\s*\{.*?\}\s*\]", text, flags=re.DOTALL)
+    # Added a condition to replace the ```json ``` format to normal json for parsing purposes
+    cleaned = _FENCE_RE.sub("", text).strip()
+
+    # Only a reply that starts like JSON is worth handing to the parser whole
+    if cleaned[:1] in ("[", "{"):
+        try:
+            obj = loads(cleaned)
+        except json.JSONDecodeError:
+            pass
+        else:
+            if isinstance(obj, list):
+                return _valid_intents(obj)
+            # Valid JSON that is not an array: rescanning it for one will not help
+            return []
+
+    # Prose around a single array: slice from the first "[" to the last "]" without any backtracking
+    start, end = cleaned.find("["), cleaned.rfind("]")
+    if 0 < start < end:
+        try:
+            obj = loads(cleaned[start:end + 1])
+        except json.JSONDecodeError:
+            pass
+        else:
+            if isinstance(obj, list):
+                return _valid_intents(obj)
+
+    match = _JSON_ARRAY_RE.search(cleaned)
     if match:
         candidate = match.group(0)
-        intents = json.loads(candidate)
-        jsonschema_validate(intents, TOOL_INTENTS_SCHEMA)
-        return intents
+        return _valid_intents(loads(candidate))
 
     # If no valid output, return an empty list (valid per schema)
-    jsonschema_validate([], TOOL_INTENTS_SCHEMA)
     return []
 
+def _complete_intents(text: str) -> list[dict[str, Any]] | None:
+    """Return the intents if text already holds one complete, valid array, else None."""
+    start, end = text.find("["), text.rfind("]")
+    if start < 0 or end < start:
+        return None
+    try:
+        obj = loads(text[start:end + 1])
+    except json.JSONDecodeError:
+        return None
+    if isinstance(obj, list) and _INTENTS_VALIDATOR.is_valid(obj):
+        return obj
+    return None
+
 class GenericExecutionLLM(ExecutionLLM):
     """
     Unified Execution LLM supporting multiple providers (Gemini, Ollama, etc.).
@@ -134,7 +201,12 @@ class GenericExecutionLLM(ExecutionLLM):
         model: str = "llama3.2",
         base_url: str = "http://localhost:11434",
         api_key: Optional[str] = None,
+        shared_client: httpx.AsyncClient | None = None,
     ):
+        """
+        shared_client, when given, is an httpx.AsyncClient the provider streams through
+        instead of opening its own; the caller owns it and must close it.
+        """
         self.provider_type = provider_type
         self.model = model
         self.base_url = base_url
@@ -143,6 +215,8 @@ class GenericExecutionLLM(ExecutionLLM):
         provider_kwargs = {}
         if provider_type.lower() == "ollama":
             provider_kwargs["base_url"] = base_url
+            if shared_client is not None:
+                provider_kwargs["client"] = shared_client
         elif provider_type.lower() == "gemini":
             provider_kwargs["api_key"] = api_key
 
@@ -162,40 +236,76 @@ class GenericExecutionLLM(ExecutionLLM):
         prompt = _build_exec_prompt(step_content, suggested_tools)
 
         try:
-            raw_response = await self.llm_provider.generate_response(prompt)
-            text = raw_response if isinstance(raw_response, str) else json.dumps(raw_response)
-            return _extract_json_array(text)
+            return await self._stream_intents(prompt)
 
         except Exception as e:
-            logger.error(f"[{self.provider_type}] Execution error: {e}")
+            # The traceback is only worth collecting when someone is debugging
+            logger.error(
+                "[%s] Execution error: %s", self.provider_type, e,
+                exc_info=logger.isEnabledFor(logging.DEBUG),
+            )
             return []
 
+    async def _stream_intents(self, prompt: str) -> list[dict[str, Any]]:
+        """Read the response as it streams, stopping once it holds a complete intent array."""
+        chunks: list[str] = []
+        stream = self.llm_provider.generate_response_stream(prompt)
+        try:
+            async for chunk in stream:
+                chunks.append(chunk if isinstance(chunk, str) else dumps(chunk))
+                # An array can only have closed on a chunk carrying "]"
+                if "]" in chunks[-1]:
+                    intents = _complete_intents("".join(chunks))
+                    if intents is not None:
+                        return intents
+        finally:
+            await stream.aclose()
+        return _extract_json_array("".join(chunks))
+
     def close(self):
         """Close provider connections (if applicable)."""
         self.llm_provider.close()
 
+    async def aclose(self):
+        """Close provider connections, including streaming ones."""
+        await self.llm_provider.aclose()
+
 class StepExecutor:
     """Executes steps using a configured Execution LLM."""
 
-    def __init__(self, exec_llm: ExecutionLLM):
+    def __init__(self, exec_llm: ExecutionLLM, max_concurrency: int = 8):
         self.exec_llm = exec_llm
+        # Caps how many steps run_steps sends to the provider at once
+        self._slots = asyncio.Semaphore(max_concurrency)
 
     async def run_step(self, step: Dict[str, Any]) -> LLMStepResponse:
         """Run a single step through the LLM to get validated tool calls."""
-        calls: List[ToolCall] = []
-
         # Gets the intents that the Execution LLM generates from the prompts
         intents = await self.exec_llm.propose_tool_intents(
             step_content=step.get("content", ""),
             suggested_tools=step.get("suggested_tools", [])
         )
 
-        for it in intents:
-            calls.append(
-                ToolCall(server=it["server"], tool=it["tool"], args=it.get("args"))
-            )
+        # Server and tool names repeat across every step, so each distinct name is stored once
+        return LLMStepResponse(
+            tool_calls=[
+                ToolCall(sys.intern(it["server"]), sys.intern(it["tool"]), it.get("args"))
+                for it in intents
+            ]
+        )
+
+    async def run_steps(self, steps: list[dict[str, Any]]) -> list[LLMStepResponse]:
+        """Run independent steps concurrently, returning their responses in step order."""
+        async def bounded(step: dict[str, Any]) -> LLMStepResponse:
+            async with self._slots:
+                return await self.run_step(step)
+
+        return list(await asyncio.gather(*(bounded(step) for step in steps)))
+
+
+# Execution LLMs by constructor arguments; closed by aclose_execution_llms
+_execution_llms: dict[tuple, GenericExecutionLLM] = {}
 
-        return LLMStepResponse(tool_calls=calls)
 
 def make_execution_llm(
     provider_type: str = "ollama",
@@ -206,10 +316,26 @@ def make_execution_llm(
     """
     Factory function to create a GenericExecutionLLM instance
     with the correct provider initialized.
+
+    Instances are cached per argument set and shared process-wide; they hold no
+    conversation state, so callers must not close them. Call aclose_execution_llms()
+    at shutdown instead.
     """
-    return GenericExecutionLLM(
-        provider_type=provider_type,
-        model=model,
-        base_url=base_url,
-        api_key=api_key,
-    )
\ No newline at end of file
+    key = (provider_type, model, base_url, api_key)
+    exec_llm = _execution_llms.get(key)
+    if exec_llm is None:
+        exec_llm = _execution_llms[key] = GenericExecutionLLM(
+            provider_type=provider_type,
+            model=model,
+            base_url=base_url,
+            api_key=api_key,
+        )
+    return exec_llm
+
+
+async def aclose_execution_llms() -> None:
+    """Close every Execution LLM handed out by make_execution_llm and empty the cache."""
+    exec_llms = list(_execution_llms.values())
+    _execution_llms.clear()
+    for exec_llm in exec_llms:
+        await exec_llm.aclose()
@@ -1,3 +1,5 @@
+import functools
+import logging
 from typing import Any, List, Optional, Mapping
 
 from langchain.llms.base import LLM
@@ -7,6 +9,20 @@ from langchain.agents import AgentType
 
 import json
 
+_tool_logger = logging.getLogger(__name__ + ".tools")
+
+# Server recorded for suggested tools that carry no "server." prefix
+UNKNOWN_SERVER = "unknown-server"
+
+
+def _make_payload(server: str, tool: str, *_args, **kwargs) -> dict:
+    """Describe a tool invocation for the coordinator to dispatch.
+
+    LangChain passes the raw tool input positionally; only keyword arguments are forwarded.
+    """
+    return {"server": server, "tool": tool, "args": kwargs}
+
+
 def GenericExecutionLLMWrapper(generic_llm: "GenericExecutionLLM") -> LLM:
     """Return a LangChain-compatible LLM from a GenericExecutionLLM."""
 
@@ -40,32 +56,27 @@ def GenericExecutionLLMWrapper(generic_llm: "GenericExecutionLLM") -> LLM:
     return _Wrapper()
 
 
+def _split_tool_entry(tool_entry: str) -> tuple[str, str]:
+    """Split "server.tool" on the first dot; bare names go to UNKNOWN_SERVER."""
+    server_name, sep, tool_name = tool_entry.partition(".")
+    if not sep:
+        return UNKNOWN_SERVER, tool_entry
+    return server_name, tool_name
+
+
 def ToolsWrapper(tools_list: List[str]) -> List[Tool]:
     """
     Convert a list of tool dicts to LangChain Tool objects.
     """
-    langchain_tools = []
-
-    for tool_entry in tools_list:
-        if "." in tool_entry:
-            server_name, tool_name = tool_entry.split(".", 1)
-        else:
-            server_name, tool_name = "unknown-server", tool_entry
-
-        # Create a LangChain Tool
-        langchain_tools.append(
-            Tool(
-                name=tool_name,
-                description= "",
-                func=lambda *args, **kwargs: {
-                    "server": server_name,
-                    "tool": tool_name,
-                    "args": kwargs,
-                },
-            )
+    # partial binds each entry's own names, which a closure in the loop would not
+    return [
+        Tool(
+            name=tool_name,
+            description="",
+            func=functools.partial(_make_payload, server_name, tool_name),
         )
-
-    return langchain_tools
+        for server_name, tool_name in map(_split_tool_entry, tools_list)
+    ]
 
 
 EXEC_SYSTEM_PROMPT = """
@@ -79,11 +90,16 @@ Rules:
 """
 
 def log_tool_call(func):
+    """Log calls to an async tool at DEBUG level."""
+
     @functools.wraps(func)
     async def wrapper(*args, **kwargs):
-        print(f"[Tool Called] {func.__name__} with args={args}, kwargs={kwargs}")
-        result = await func(*args, **kwargs) if callable(func) else None
-        print(f"[Tool Result] {func.__name__} => {result}")
+        # Checked per call, since logging may be configured after the tool is decorated
+        if not _tool_logger.isEnabledFor(logging.DEBUG):
+            return await func(*args, **kwargs)
+        _tool_logger.debug("[Tool Called] %s with args=%s, kwargs=%s", func.__name__, args, kwargs)
+        result = await func(*args, **kwargs)
+        _tool_logger.debug("[Tool Result] %s => %s", func.__name__, result)
         return result
     return wrapper
 
@@ -104,7 +120,6 @@ def make_execution_agent(llm, suggested_tools: List[Tool]):
     - Returns validated JSON
     """
     tools = make_langchain_tools(suggested_tools)
-    
     agent = initialize_agent(
             tools=tools,
             llm=llm,
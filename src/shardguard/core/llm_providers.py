@@ -1,13 +1,20 @@
 """LLM provider implementations for ShardGuard."""
 
-import json
+import asyncio
 import logging
 import os
 from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator
+
+from shardguard.utils.serialization import dumps, loads
 
 logger = logging.getLogger(__name__)
 
 
+class FallbackResponse(str):
+    """Reply made up locally when the model could not be reached, so callers can tell it from a real one."""
+
+
 class LLMProvider(ABC):
     """Abstract base class for LLM providers."""
 
@@ -26,16 +33,37 @@ class LLMProvider(ABC):
         """Close any open connections."""
         pass
 
+    async def generate_response_stream(self, prompt: str) -> AsyncIterator[str]:
+        """Yield the response in chunks as they arrive; by default the whole response at once."""
+        yield await self.generate_response(prompt)
+
+    async def aclose(self):
+        """Close any open connections, including asynchronous ones."""
+        self.close()
+
 
 class OllamaProvider(LLMProvider):
     """Ollama LLM provider for local models."""
 
     def __init__(
-        self, model: str = "llama3.2", base_url: str = "http://localhost:11434"
+        self,
+        model: str = "llama3.2",
+        base_url: str = "http://localhost:11434",
+        async_client=None,
+        response_format: dict | str | None = None,
     ):
         self.model = model
         self.base_url = base_url
         self.client = None
+        # Sent as Ollama's "format" to constrain decoding (a JSON schema, or "json")
+        self.response_format = response_format
+        self._send_format = response_format is not None
+        # Streaming client injected by the caller, who owns its lifetime
+        self._shared_async_client = async_client
+        # Streaming client, created on first use in each event loop
+        self._async_client = None
+        self._async_client_loop = None
+        self._async_client_cls = None
         self._init_client()
 
     def _init_client(self):
@@ -44,81 +72,162 @@ class OllamaProvider(LLMProvider):
             import httpx
 
             self.client = httpx.Client(timeout=300.0)
+            self._async_client_cls = httpx.AsyncClient
         except ImportError:
             logger.warning(
                 "httpx not available. Ollama provider will use mock responses."
             )
 
+    def _request_body(self, prompt: str, stream: bool) -> dict:
+        """Build the /api/generate request body."""
+        body = {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": stream,
+            "options": {
+                "temperature": 0.1,
+                "top_p": 0.9,
+                "num_predict": 2048,
+            },
+        }
+        if self._send_format:
+            body["format"] = self.response_format
+        return body
+
+    def _drop_rejected_format(self, error: Exception) -> bool:
+        """Stop sending "format" once the server rejects it; True means retry without it.
+
+        Ollama releases before 0.5 only accept "json", not a schema.
+        """
+        response = getattr(error, "response", None)
+        if not self._send_format or getattr(response, "status_code", None) != 400:
+            return False
+        logger.warning("Ollama rejected the response format; retrying without it")
+        self._send_format = False
+        return True
+
     async def generate_response(self, prompt: str) -> str:
-        """Generate a response using Ollama."""
-        if not self.client:
+        """Generate a response using Ollama without blocking the event loop."""
+        client = await self._get_async_client()
+        if client is None:
             return self._mock_response(prompt)
 
-        try:
-            response = self.client.post(
-                f"{self.base_url}/api/generate",
-                json={
-                    "model": self.model,
-                    "prompt": prompt,
-                    "stream": False,
-                    "options": {
-                        "temperature": 0.1,
-                        "top_p": 0.9,
-                        "num_predict": 2048,
-                    },
-                },
-            )
-            response.raise_for_status()
-            result = response.json()
-            return result.get("response", "")
-        except Exception as e:
-            logger.error(f"Error calling Ollama: {e}")
-            return self._mock_response(prompt, error=str(e))
+        while True:
+            try:
+                response = await client.post(
+                    f"{self.base_url}/api/generate",
+                    json=self._request_body(prompt, stream=False),
+                )
+                response.raise_for_status()
+                result = response.json()
+                return result.get("response", "")
+            except Exception as e:
+                if self._drop_rejected_format(e):
+                    continue
+                logger.error(f"Error calling Ollama: {e}")
+                return self._mock_response(prompt, error=str(e))
 
     def generate_response_sync(self, prompt: str) -> str:
         """Generate a response using Ollama (synchronous)."""
         if not self.client:
             return self._mock_response(prompt)
 
+        while True:
+            try:
+                response = self.client.post(
+                    f"{self.base_url}/api/generate",
+                    json=self._request_body(prompt, stream=False),
+                )
+                response.raise_for_status()
+                result = response.json()
+                return result.get("response", "")
+            except Exception as e:
+                if self._drop_rejected_format(e):
+                    continue
+                logger.error(f"Error calling Ollama: {e}")
+                return self._mock_response(prompt, error=str(e))
+
+    async def _get_async_client(self):
+        """Return the streaming HTTP client, or None when httpx is not available."""
+        if self._shared_async_client is not None:
+            return self._shared_async_client
+        if self.client is None:
+            return None
+        # Async connections belong to the loop that opened them, so a provider reused
+        # from another loop gets a fresh client
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_client_loop is not loop:
+            if self._async_client is not None:
+                await self._close_async_client()
+            self._async_client = self._async_client_cls(timeout=300.0)
+            self._async_client_loop = loop
+        return self._async_client
+
+    async def _close_async_client(self):
+        """Close the streaming client and forget it."""
+        client = self._async_client
+        self._async_client = None
+        self._async_client_loop = None
         try:
-            response = self.client.post(
-                f"{self.base_url}/api/generate",
-                json={
-                    "model": self.model,
-                    "prompt": prompt,
-                    "stream": False,
-                    "options": {
-                        "temperature": 0.1,
-                        "top_p": 0.9,
-                        "num_predict": 2048,
-                    },
-                },
-            )
-            response.raise_for_status()
-            result = response.json()
-            return result.get("response", "")
+            await client.aclose()
         except Exception as e:
-            logger.error(f"Error calling Ollama: {e}")
-            return self._mock_response(prompt, error=str(e))
+            # Connections opened on a loop that has since closed cannot shut down cleanly
+            logger.debug("Error closing Ollama async client: %s", e)
+
+    async def generate_response_stream(self, prompt: str) -> AsyncIterator[str]:
+        """Yield the Ollama response token chunks as the model produces them."""
+        client = await self._get_async_client()
+        if client is None:
+            yield self._mock_response(prompt)
+            return
 
-    def _mock_response(self, prompt: str, error: str | None = None) -> str:
+        streamed = False
+        while True:
+            try:
+                async with client.stream(
+                    "POST",
+                    f"{self.base_url}/api/generate",
+                    json=self._request_body(prompt, stream=True),
+                ) as response:
+                    response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        if not line:
+                            continue
+                        chunk = loads(line)
+                        if chunk.get("response"):
+                            streamed = True
+                            yield chunk["response"]
+                        if chunk.get("done"):
+                            break
+                return
+            except Exception as e:
+                if not streamed and self._drop_rejected_format(e):
+                    continue
+                logger.error(f"Error calling Ollama: {e}")
+                if not streamed:
+                    yield self._mock_response(prompt, error=str(e))
+                return
+
+    def _mock_response(self, prompt: str, error: str | None = None) -> FallbackResponse:
         """Generate a mock response for testing or fallback."""
         content = (
             f"Error occurred: {error}"
             if error
             else "This is a mock response - httpx not available"
         )
-        return json.dumps(
-            {
-                "original_prompt": prompt,
-                "sub_prompts": [
-                    {
-                        "id": 1,
-                        "content": content,
-                        "opaque_values": {},
-                    }
-                ],
-            }
+        return FallbackResponse(
+            dumps(
+                {
+                    "original_prompt": prompt,
+                    "sub_prompts": [
+                        {
+                            "id": 1,
+                            "content": content,
+                            "opaque_values": {},
+                        }
+                    ],
+                }
+            )
         )
 
     def close(self):
@@ -126,6 +235,12 @@ class OllamaProvider(LLMProvider):
         if self.client:
             self.client.close()
 
+    async def aclose(self):
+        """Close the streaming client as well as the HTTP client; an injected client is left open."""
+        if self._async_client is not None:
+            await self._close_async_client()
+        self.close()
+
 
 class GeminiProvider(LLMProvider):
     """Google Gemini LLM provider for remote models."""
@@ -196,24 +311,26 @@ class GeminiProvider(LLMProvider):
             logger.error(f"Error calling Gemini: {e}")
             return self._mock_response(prompt, error=str(e))
 
-    def _mock_response(self, prompt: str, error: str | None = None) -> str:
+    def _mock_response(self, prompt: str, error: str | None = None) -> FallbackResponse:
         """Generate a mock response for testing or fallback."""
         content = (
             f"Error occurred: {error}"
             if error
             else "This is a mock response - Gemini API not available"
         )
-        return json.dumps(
-            {
-                "original_prompt": prompt,
-                "sub_prompts": [
-                    {
-                        "id": 1,
-                        "content": content,
-                        "opaque_values": {},
-                    }
-                ],
-            }
+        return FallbackResponse(
+            dumps(
+                {
+                    "original_prompt": prompt,
+                    "sub_prompts": [
+                        {
+                            "id": 1,
+                            "content": content,
+                            "opaque_values": {},
+                        }
+                    ],
+                }
+            )
         )
 
     def close(self):
@@ -225,7 +342,12 @@ def create_provider(provider_type: str, model: str, **kwargs) -> LLMProvider:
     """Create an LLM provider based on the provider type."""
     if provider_type.lower() == "ollama":
         base_url = kwargs.get("base_url", "http://localhost:11434")
-        return OllamaProvider(model=model, base_url=base_url)
+        return OllamaProvider(
+            model=model,
+            base_url=base_url,
+            async_client=kwargs.get("client"),
+            response_format=kwargs.get("response_format"),
+        )
     elif provider_type.lower() == "gemini":
         api_key = kwargs.get("api_key") or os.getenv("GEMINI_API_KEY")
         return GeminiProvider(model=model, api_key=api_key)
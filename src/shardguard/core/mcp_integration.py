@@ -1,22 +1,200 @@
 """MCP client integration for ShardGuard using the official Python SDK."""
 
+import asyncio
+import importlib
 import logging
+import os
 import sys
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import AbstractAsyncContextManager, asynccontextmanager
+from functools import partial
 from typing import Any
 
+import anyio
 from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
+from mcp.shared.exceptions import McpError
+from mcp.shared.memory import create_connected_server_and_client_session
+from mcp.types import CONNECTION_CLOSED
 
 logger = logging.getLogger(__name__)
 
+NO_TOOLS_DESCRIPTION = "No MCP tools available."
+_TOOLS_DESCRIPTION_HEADER = "Available MCP Tools:\n\n"
+_TOOLS_DESCRIPTION_FOOTER = "When suggesting tools for tasks, include the tool names in your sub-task 'suggested_tools' field."
+
+
+class MCPConnectionError(ConnectionError):
+    """The connection to an MCP server was lost while a tool call was in flight."""
+
+
+def _server_answered(error: BaseException) -> bool:
+    """Whether an error was answered by the server, which leaves its session usable."""
+    return isinstance(error, McpError) and error.error.code != CONNECTION_CLOSED
+
+
+def _result_text(result) -> str:
+    """Extract the text content from a tool call result."""
+    if result.content:
+        return "\n".join(item.text for item in result.content if hasattr(item, "text"))
+    return "Tool executed successfully (no content returned)"
+
+
+async def _list_tools_op(session: ClientSession) -> list[Any]:
+    """Return the tools a server exposes."""
+    tools_response = await session.list_tools()
+    return tools_response.tools
+
+
+async def _call_tool_op(
+    tool_name: str, arguments: dict[str, Any], session: ClientSession
+) -> str:
+    """Call one tool and return its text output."""
+    result = await session.call_tool(tool_name, arguments)
+    return _result_text(result)
+
+
+async def _call_tools_batch_op(
+    server_name: str,
+    calls: list[tuple[str, dict[str, Any]]],
+    session: ClientSession,
+) -> list[str | None]:
+    """Issue several tool calls together on one session.
+
+    Calls the server rejected yield None; a broken transport is raised.
+    """
+    results = await asyncio.gather(
+        *(session.call_tool(tool, args) for tool, args in calls),
+        return_exceptions=True,
+    )
+    texts = []
+    for (tool, _), result in zip(calls, results, strict=True):
+        if isinstance(result, BaseException):
+            if not _server_answered(result):
+                raise result
+            logger.debug("Error calling %s on %s: %s", tool, server_name, result)
+            texts.append(None)
+        else:
+            texts.append(_result_text(result))
+    return texts
+
+
+@asynccontextmanager
+async def _stdio_session(
+    server_params: StdioServerParameters,
+) -> AsyncIterator[ClientSession]:
+    """Spawn a server subprocess and yield an initialized session over its stdio.
+
+    The body is cancelled once the server's output closes, so a server that exits
+    ends the session rather than leaving it writing to a dead pipe.
+    """
+    async with stdio_client(server_params) as (read, write):
+        # Server messages are relayed so the end of its output can be seen
+        relay_writer, relay_reader = anyio.create_memory_object_stream(0)
+        async with anyio.create_task_group() as tg:
+
+            async def relay() -> None:
+                async with relay_writer:
+                    async for message in read:
+                        await relay_writer.send(message)
+                tg.cancel_scope.cancel()
+
+            tg.start_soon(relay)
+            async with ClientSession(relay_reader, write) as session:
+                await session.initialize()
+                yield session
+            tg.cancel_scope.cancel()
+
+
+def _format_input_schema(schema: Any) -> str:
+    """Format a tool's input properties as indented description lines."""
+    if not isinstance(schema, dict) or "properties" not in schema:
+        return ""
+    required = schema.get("required", [])
+    return "".join(
+        f"    - {prop_name}: {prop_info.get('description', 'No description')}"
+        f"{' (required)' if prop_name in required else ''}\n"
+        for prop_name, prop_info in schema["properties"].items()
+    )
+
+
+class _ServerConnection:
+    """A long-lived session to a single MCP server.
+
+    The transport is entered and exited inside one dedicated task, since its
+    cancel scopes must be closed by the task that opened them.
+    """
+
+    def __init__(
+        self, open_session: Callable[[], AbstractAsyncContextManager[ClientSession]]
+    ):
+        self._open_session = open_session
+        self._closing = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self.session: ClientSession | None = None
+
+    async def start(self) -> None:
+        """Spawn the server and wait for its session to be initialized."""
+        ready = asyncio.get_running_loop().create_future()
+        self._task = asyncio.create_task(self._serve(ready))
+        self.session = await ready
+
+    async def run(self, operation: Callable[[ClientSession], Awaitable[Any]]) -> Any:
+        """Run an operation on the session, raising ConnectionError if the server exits first.
+
+        Without this a request in flight when the server dies would wait forever
+        for its response.
+        """
+        call = asyncio.ensure_future(operation(self.session))
+        try:
+            await asyncio.wait((call, self._task), return_when=asyncio.FIRST_COMPLETED)
+            if not call.done():
+                raise ConnectionError("MCP server exited")
+            return call.result()
+        finally:
+            # Also reached when the caller is cancelled while waiting
+            call.cancel()
+
+    async def _serve(self, ready: asyncio.Future) -> None:
+        try:
+            async with self._open_session() as session:
+                ready.set_result(session)
+                await self._closing.wait()
+        except asyncio.CancelledError:
+            if not ready.done():
+                ready.cancel()
+            raise
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(e)
+            else:
+                logger.debug("MCP session closed with error: %s", e)
+
+    @property
+    def alive(self) -> bool:
+        """Whether the session task, and with it the server, is still running.
+
+        The task finishes on its own when the server's transport closes.
+        """
+        return self._task is not None and not self._task.done()
+
+    async def close(self) -> None:
+        """Shut the session down and wait for the server to exit."""
+        self._closing.set()
+        if self._task is not None:
+            await asyncio.gather(self._task, return_exceptions=True)
+
 
 class MCPClient:
-    """Client for communicating with MCP servers."""
+    """Client for communicating with MCP servers.
+
+    Sessions are opened on first use and kept alive so repeated calls to the
+    same server skip the subprocess spawn and initialize handshake. Call
+    ``aclose()`` to shut them down.
+    """
 
     def __init__(self):
         """Initialize the MCP client."""
-        import os
-
         # Get the absolute path to the servers directory
         current_dir = os.path.dirname(os.path.abspath(__file__))
         servers_dir = os.path.join(os.path.dirname(current_dir), "mcp_servers")
@@ -26,130 +204,261 @@ class MCPClient:
             "file-server": {
                 "command": sys.executable,
                 "args": [os.path.join(servers_dir, "file_server.py")],
+                "module": "shardguard.mcp_servers.file_server",
                 "description": "File server with security controls",
             },
             "email-server": {
                 "command": sys.executable,
                 "args": [os.path.join(servers_dir, "email_server.py")],
+                "module": "shardguard.mcp_servers.email_server",
                 "description": "Email server with privacy controls",
             },
             "database-server": {
                 "command": sys.executable,
                 "args": [os.path.join(servers_dir, "database_server.py")],
+                "module": "shardguard.mcp_servers.database_server",
                 "description": "Database server with security controls",
             },
             "web-server": {
                 "command": sys.executable,
                 "args": [os.path.join(servers_dir, "web_server.py")],
+                "module": "shardguard.mcp_servers.web_server",
                 "description": "Web server with security controls",
             },
         }
+        # The per-server heading of the tools description never changes, so it is formatted once
+        self._server_headers = {
+            name: f"Server: {name} - {config.get('description', 'MCP Server')}\n"
+            for name, config in self.server_configs.items()
+        }
+        # (server, tool) -> (input schema, its formatted lines); reused while the schema is unchanged
+        self._schema_lines: dict[tuple[str, str], tuple[Any, str]] = {}
+        self._connections: dict[str, _ServerConnection] = {}
+        self._connect_locks: dict[str, asyncio.Lock] = {}
 
-    async def _execute_with_server(self, server_name: str, operation):
-        """Execute an operation with a server connection."""
+    async def _get_connection(self, server_name: str) -> _ServerConnection:
+        """Return the pooled connection for a server, connecting if needed.
+
+        A connection whose server has exited is discarded and the server respawned.
+        """
+        connection = self._connections.get(server_name)
+        if connection is not None and connection.alive:
+            return connection
+
+        lock = self._connect_locks.setdefault(server_name, asyncio.Lock())
+        async with lock:
+            connection = self._connections.get(server_name)
+            if connection is not None and not connection.alive:
+                await self._discard_connection(server_name, connection)
+                connection = None
+            if connection is None:
+                connection = _ServerConnection(partial(self._open_session, server_name))
+                await connection.start()
+                self._connections[server_name] = connection
+        return connection
+
+    def _open_session(
+        self, server_name: str
+    ) -> AbstractAsyncContextManager[ClientSession]:
+        """Return the transport context that yields an initialized session for a server."""
+        config = self.server_configs[server_name]
+        return _stdio_session(
+            StdioServerParameters(command=config["command"], args=config["args"])
+        )
+
+    async def _discard_connection(
+        self, server_name: str, connection: _ServerConnection
+    ) -> None:
+        """Tear down a broken connection so the next call spawns the server again."""
+        if self._connections.get(server_name) is not connection:
+            # Another caller has already replaced it
+            return
+        del self._connections[server_name]
+        await connection.close()
+
+    async def aclose(self) -> None:
+        """Close all pooled server sessions."""
+        connections = list(self._connections.values())
+        self._connections.clear()
+        await asyncio.gather(*(c.close() for c in connections))
+
+    async def _execute_with_server(
+        self, server_name: str, operation, idempotent: bool = False
+    ):
+        """Execute an operation with a server connection.
+
+        Errors answered by the server yield None. A broken transport discards the
+        session; idempotent operations are then retried once on a fresh session,
+        and any other operation raises MCPConnectionError, since the server may
+        already have acted on it.
+        """
         if server_name not in self.server_configs:
             return None
 
-        try:
-            config = self.server_configs[server_name]
-            server_params = StdioServerParameters(
-                command=config["command"], args=config["args"]
-            )
-
-            async with stdio_client(server_params) as (read, write):
-                async with ClientSession(read, write) as session:
-                    await session.initialize()
-                    return await operation(session)
-        except Exception as e:
-            logger.debug(
-                "Error connecting to %s: %s: %s", server_name, type(e).__name__, e
-            )
-            if hasattr(e, "__cause__") and e.__cause__:
+        for _attempt in range(2 if idempotent else 1):
+            connection = None
+            try:
+                connection = await self._get_connection(server_name)
+                return await connection.run(operation)
+            except Exception as e:
+                if _server_answered(e):
+                    # The session is still healthy
+                    logger.debug("Error from %s: %s", server_name, e)
+                    return None
+                if connection is not None:
+                    await self._discard_connection(server_name, connection)
                 logger.debug(
-                    "  Caused by: %s: %s", type(e.__cause__).__name__, e.__cause__
+                    "Error connecting to %s: %s: %s", server_name, type(e).__name__, e
                 )
-            if hasattr(e, "exceptions"):
-                logger.debug("  Sub-exceptions: %d", len(e.exceptions))
-                for i, sub_e in enumerate(e.exceptions):
-                    logger.debug("    %d: %s: %s", i, type(sub_e).__name__, sub_e)
-            return None
+                if hasattr(e, "__cause__") and e.__cause__:
+                    logger.debug(
+                        "  Caused by: %s: %s", type(e.__cause__).__name__, e.__cause__
+                    )
+                if hasattr(e, "exceptions"):
+                    logger.debug("  Sub-exceptions: %d", len(e.exceptions))
+                    for i, sub_e in enumerate(e.exceptions):
+                        logger.debug("    %d: %s: %s", i, type(sub_e).__name__, sub_e)
+                if not idempotent:
+                    raise MCPConnectionError(
+                        f"Lost connection to MCP server {server_name}"
+                    ) from e
+        return None
 
     async def list_tools(self, server_name: str | None = None) -> dict[str, list[Any]]:
         """List available tools from one or all servers."""
-        tools_by_server = {}
-
         servers_to_check = (
             [server_name] if server_name else list(self.server_configs.keys())
         )
 
-        for server in servers_to_check:
-
-            async def get_tools(session):
-                tools_response = await session.list_tools()
-                return tools_response.tools
-
-            tools = await self._execute_with_server(server, get_tools)
-            tools_by_server[server] = tools or []
+        # Servers are queried concurrently, so a cold start costs one spawn and handshake rather than one per server
+        results = await asyncio.gather(
+            *(
+                self._execute_with_server(server, _list_tools_op, idempotent=True)
+                for server in servers_to_check
+            ),
+            return_exceptions=True,
+        )
 
+        tools_by_server = {}
+        for server, tools in zip(servers_to_check, results, strict=True):
+            if isinstance(tools, BaseException):
+                logger.debug("Error listing tools on %s: %s", server, tools)
+                tools_by_server[server] = []
+            else:
+                tools_by_server[server] = tools or []
         return tools_by_server
 
+    def _input_schema_lines(self, server_name: str, tool_name: str, schema: Any) -> str:
+        """Return the formatted schema lines for a tool, reformatting only when its schema changed."""
+        key = (server_name, tool_name)
+        cached = self._schema_lines.get(key)
+        # Schemas are compared by value; each listing returns fresh objects, so identity would never match
+        if cached is not None and cached[0] == schema:
+            return cached[1]
+        lines = _format_input_schema(schema)
+        self._schema_lines[key] = (schema, lines)
+        return lines
+
     async def call_tool(
         self, server_name: str, tool_name: str, arguments: dict[str, Any]
     ) -> str | None:
-        """Call a tool on a specific server."""
+        """Call a tool on a specific server.
 
-        async def call_tool_op(session):
-            result = await session.call_tool(tool_name, arguments)
+        Returns None when the server rejects the call, and raises MCPConnectionError
+        when the connection is lost.
+        """
+        return await self._execute_with_server(
+            server_name, partial(_call_tool_op, tool_name, arguments)
+        )
 
-            # Extract text content from the response
-            if result.content:
-                return "\n".join(
-                    item.text for item in result.content if hasattr(item, "text")
-                )
-            return "Tool executed successfully (no content returned)"
+    async def call_tools_batch(
+        self, server_name: str, calls: list[tuple[str, dict[str, Any]]]
+    ) -> list[str | None]:
+        """Call several tools on one server, issuing them together on one session.
+
+        Results are returned in the order of ``calls``; a call the server rejected
+        yields None. A lost connection raises MCPConnectionError.
+        """
+        results = await self._execute_with_server(
+            server_name, partial(_call_tools_batch_op, server_name, calls)
+        )
+        return results if results is not None else [None] * len(calls)
+
+    async def call_tools(
+        self, calls: list[tuple[str, str, dict[str, Any]]]
+    ) -> list[str | None]:
+        """Call tools across servers given as (server, tool, arguments) triples.
+
+        Calls are batched per server and all servers run concurrently. Results
+        are returned in the order of ``calls``; a call the server rejected yields
+        None, and a lost connection raises MCPConnectionError.
+        """
+        positions_by_server: dict[str, list[int]] = {}
+        for i, (server_name, _, _) in enumerate(calls):
+            positions_by_server.setdefault(server_name, []).append(i)
 
-        return await self._execute_with_server(server_name, call_tool_op)
+        batches = await asyncio.gather(
+            *(
+                self.call_tools_batch(server_name, [calls[i][1:] for i in positions])
+                for server_name, positions in positions_by_server.items()
+            )
+        )
+
+        results: list[str | None] = [None] * len(calls)
+        for positions, batch in zip(positions_by_server.values(), batches, strict=True):
+            for i, result in zip(positions, batch, strict=True):
+                results[i] = result
+        return results
 
     async def get_tools_description(self) -> str:
         """Get a formatted description of all available tools."""
         tools_by_server = await self.list_tools()
 
         if not any(tools_by_server.values()):
-            return "No MCP tools available."
+            return NO_TOOLS_DESCRIPTION
 
-        description = "Available MCP Tools:\n\n"
+        parts = [_TOOLS_DESCRIPTION_HEADER]
+        append = parts.append
 
         for server_name, tools in tools_by_server.items():
             if tools:
-                config = self.server_configs.get(server_name, {})
-                server_desc = config.get("description", "MCP Server")
-                description += f"Server: {server_name} - {server_desc}\n"
+                append(self._server_headers[server_name])
 
                 for tool in tools:
-                    description += f"  • {tool.name}: {tool.description}\n"
+                    append(f"  • {tool.name}: {tool.description}\n")
 
                     # Add input schema details
-                    if hasattr(tool, "inputSchema") and tool.inputSchema:
-                        schema = tool.inputSchema
-                        if isinstance(schema, dict) and "properties" in schema:
-                            required = schema.get("required", [])
-                            for prop_name, prop_info in schema["properties"].items():
-                                req_marker = (
-                                    " (required)" if prop_name in required else ""
-                                )
-                                prop_desc = prop_info.get(
-                                    "description", "No description"
-                                )
-                                description += (
-                                    f"    - {prop_name}: {prop_desc}{req_marker}\n"
-                                )
-
-                description += "\n"
-        
-        description += "When suggesting tools for tasks, include the tool names in your sub-task 'suggested_tools' field."
-        return description
+                    schema = getattr(tool, "inputSchema", None)
+                    if schema:
+                        append(self._input_schema_lines(server_name, tool.name, schema))
+
+                append("\n")
+
+        append(_TOOLS_DESCRIPTION_FOOTER)
+        return "".join(parts)
     
     async def list_tool_names(self):
         tools_by_server = await self.list_tools()
         tool_names = [f"{server}.{tool.name}" for server, tools in tools_by_server.items() for tool in tools]
-        return tool_names
\ No newline at end of file
+        return tool_names
+
+
+class InProcessMCPClient(MCPClient):
+    """MCP client that runs the bundled servers inside this process.
+
+    Each server module's ``Server`` is driven over in-memory streams, so calls
+    still go through the MCP protocol but no subprocess is spawned.
+    """
+
+    def _open_session(
+        self, server_name: str
+    ) -> AbstractAsyncContextManager[ClientSession]:
+        module = importlib.import_module(self.server_configs[server_name]["module"])
+        return create_connected_server_and_client_session(module.server)
+
+
+def create_mcp_client() -> MCPClient:
+    """Create the MCP client; SHARDGUARD_INPROC_MCP=1 selects the in-process servers."""
+    if os.getenv("SHARDGUARD_INPROC_MCP") == "1":
+        return InProcessMCPClient()
+    return MCPClient()
@@ -0,0 +1,152 @@
+"""Caches for Planning LLM output, keyed by model and user prompt."""
+
+import asyncio
+import hashlib
+import os
+import tempfile
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+
+# Bump whenever PLANNING_PROMPT changes so plans made with the old prompt are not reused
+PLAN_CACHE_VERSION = "v1"
+
+# Seconds an in-memory plan is reused before the Planning LLM is asked again
+DEFAULT_PLAN_TTL = 3600.0
+
+
+def plan_cache_key(model: str, user_input: str, base_url: str = "") -> str:
+    """Build the cache key for a user prompt planned by the given model and endpoint."""
+    digest = hashlib.sha256()
+    # Each field is length-prefixed, so no choice of field contents can collide with another split
+    for field in (PLAN_CACHE_VERSION, model, base_url, user_input):
+        data = field.encode()
+        digest.update(len(data).to_bytes(8, "big"))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+class PlanCache(ABC):
+    """Abstract base class for plan caches; values are validated plan JSON strings."""
+
+    # Whether entries outlive the process; such caches are never given plans holding opaque values
+    persistent: bool = False
+
+    @abstractmethod
+    async def get(self, key: str) -> str | None:
+        """Return the cached plan JSON for key, or None on a miss."""
+        pass
+
+    @abstractmethod
+    async def set(self, key: str, value: str, ttl: float | None = None) -> None:
+        """Store plan JSON under key, expiring after ttl seconds when given."""
+        pass
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        """Drop the plan cached under key, if any."""
+        pass
+
+    @abstractmethod
+    async def clear(self) -> None:
+        """Drop every cached plan."""
+        pass
+
+
+class InMemoryPlanCache(PlanCache):
+    """Least-recently-used plan cache held in process memory."""
+
+    def __init__(self, max_entries: int = 128, ttl: float | None = DEFAULT_PLAN_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # key -> (plan JSON, monotonic expiry time or None)
+        self._entries: OrderedDict[str, tuple[str, float | None]] = OrderedDict()
+        self._lock = asyncio.Lock()
+
+    async def get(self, key: str) -> str | None:
+        async with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and time.monotonic() >= expires_at:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    async def set(self, key: str, value: str, ttl: float | None = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        async with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def delete(self, key: str) -> None:
+        async with self._lock:
+            self._entries.pop(key, None)
+
+    async def clear(self) -> None:
+        async with self._lock:
+            self._entries.clear()
+
+
+class FilePlanCache(PlanCache):
+    """Plan cache persisted as one <key>.json file per plan under cache_dir.
+
+    Survives restarts, so repeated runs of the same prompts skip the Planning LLM.
+    Expiry uses the file's modification time; delete() and clear() evict entries
+    early. Plans are stored in plaintext, so plans carrying opaque values are not
+    handed to this cache, and neither are fallback plans from failed LLM calls.
+    """
+
+    persistent = True
+
+    def __init__(self, cache_dir: str | os.PathLike, ttl: float | None = None):
+        self.cache_dir = Path(cache_dir)
+        self.ttl = ttl
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def _read(self, key: str) -> str | None:
+        path = self._path(key)
+        try:
+            if self.ttl is not None and time.time() - path.stat().st_mtime >= self.ttl:
+                path.unlink(missing_ok=True)
+                return None
+            return path.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return None
+
+    def _write(self, key: str, value: str) -> None:
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        # Write to a temporary file and rename, so readers never see a partial plan
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(value)
+            os.replace(tmp, self._path(key))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def _clear(self) -> None:
+        for path in self.cache_dir.glob("*.json"):
+            path.unlink(missing_ok=True)
+
+    async def get(self, key: str) -> str | None:
+        return await asyncio.to_thread(self._read, key)
+
+    async def set(self, key: str, value: str, ttl: float | None = None) -> None:
+        # Expiry is decided on read from the cache-wide ttl; a per-entry ttl is not stored
+        await asyncio.to_thread(self._write, key, value)
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self._path(key).unlink, missing_ok=True)
+
+    async def clear(self) -> None:
+        await asyncio.to_thread(self._clear)
@@ -1,14 +1,19 @@
 """Planning LLM with MCP integration and multiple provider support."""
 
-import json
+import asyncio
 import logging
-import re
+import time
 
-from shardguard.core.llm_providers import create_provider
-from shardguard.core.mcp_integration import MCPClient
+from shardguard.core.llm_providers import FallbackResponse, create_provider
+from shardguard.core.mcp_integration import NO_TOOLS_DESCRIPTION, create_mcp_client
+from shardguard.core.schemas import PLANNING_LLM_SCHEMA
+from shardguard.utils.serialization import JSONObjectScanner, dumps, find_json_object
 
 logger = logging.getLogger(__name__)
 
+# Seconds a fetched MCP tools description is reused before listing the servers again
+TOOLS_DESCRIPTION_TTL = 60.0
+
 class PlanningLLM:
     """Planning LLM with MCP integration and multiple provider support."""
 
@@ -18,18 +23,29 @@ class PlanningLLM:
         model: str = "llama3.2",
         base_url: str = "http://localhost:11434",
         api_key: str | None = None,
+        shared_client=None,
     ):
-        """Initialize with MCP client integration and configurable LLM provider."""
+        """Initialize with MCP client integration and configurable LLM provider.
+
+        shared_client, when given, is an httpx.AsyncClient the Ollama provider sends
+        through instead of opening its own; the caller owns it and must close it.
+        """
         self.provider_type = provider_type
         self.model = model
         self.base_url = base_url
         self.api_key = api_key
-        self.mcp_client = MCPClient()
+        self.mcp_client = create_mcp_client()
+        self._tools_desc_cache: tuple[float, str] | None = None
+        self._tools_desc_lock = asyncio.Lock()
 
         # Create the appropriate LLM provider
         provider_kwargs = {}
         if provider_type.lower() == "ollama":
             provider_kwargs["base_url"] = base_url
+            # Constrained decoding keeps the reply to the plan schema, so extraction rarely has work to do
+            provider_kwargs["response_format"] = PLANNING_LLM_SCHEMA
+            if shared_client is not None:
+                provider_kwargs["client"] = shared_client
         elif provider_type.lower() == "gemini":
             provider_kwargs["api_key"] = api_key
 
@@ -39,68 +55,112 @@ class PlanningLLM:
 
     async def generate_plan(self, prompt: str) -> str:
         """Generate a plan using the configured LLM provider."""
-        tools_description = await self.mcp_client.get_tools_description()
+        tools_description = await self.get_available_tools_description()
 
         # Create enhanced prompt with tools
         enhanced_prompt = (
             f"{prompt}\n\n{tools_description}"
-            if tools_description != "No MCP tools available."
+            if tools_description != NO_TOOLS_DESCRIPTION
             else prompt
         )
 
         logger.debug("Full prompt sent to model:\n%s", enhanced_prompt)
 
         try:
-            raw_response = await self.llm_provider.generate_response(enhanced_prompt)
+            raw_response = await self._stream_plan(enhanced_prompt)
+            # A provider's own fallback is already plan JSON and must stay marked as one
+            if isinstance(raw_response, FallbackResponse):
+                return raw_response
             return self._extract_json_from_response(raw_response)
         except Exception as e:
             logger.error(f"Error generating plan: {e}")
             return self._create_fallback_response(prompt, str(e))
 
-    async def get_available_tools_description(self) -> str:
-        """Get formatted description of all available MCP tools."""
-        return await self.mcp_client.get_tools_description()
+    async def generate_plan_many(self, prompts: list[str]) -> list[str]:
+        """Generate plans for several prompts concurrently, returned in prompt order.
+
+        The tools description is fetched once for the whole batch. Ollama only
+        overlaps the requests if the server runs with OLLAMA_NUM_PARALLEL > 1.
+        """
+        return list(await asyncio.gather(*(self.generate_plan(p) for p in prompts)))
+
+    async def _stream_plan(self, prompt: str) -> str:
+        """Stream the model reply, stopping once it holds a complete JSON object.
+
+        Returns that object, the provider's fallback reply unchanged, or the whole reply when none completes.
+        """
+        scanner = JSONObjectScanner()
+        stream = self.llm_provider.generate_response_stream(prompt)
+        try:
+            async for chunk in stream:
+                if isinstance(chunk, FallbackResponse):
+                    return chunk
+                plan = scanner.feed(chunk)
+                if plan is not None:
+                    return plan
+        finally:
+            # Closing the generator also closes the HTTP response, so the model stops generating
+            await stream.aclose()
+        return scanner.text
+
+    async def get_available_tools_description(self, refresh: bool = False) -> str:
+        """Get formatted description of all available MCP tools.
+
+        The description is cached for TOOLS_DESCRIPTION_TTL seconds; concurrent
+        callers share one fetch. Pass refresh=True to list the servers again.
+        """
+        async with self._tools_desc_lock:
+            cached = self._tools_desc_cache
+            if (
+                not refresh
+                and cached is not None
+                and time.monotonic() - cached[0] < TOOLS_DESCRIPTION_TTL
+            ):
+                return cached[1]
+
+            description = await self.mcp_client.get_tools_description()
+            self._tools_desc_cache = (time.monotonic(), description)
+            return description
+
+    def invalidate_tools_cache(self) -> None:
+        """Drop the cached tools description so the next plan lists the servers again."""
+        self._tools_desc_cache = None
 
     def _extract_json_from_response(self, response: str) -> str:
         """Extract JSON from LLM response that might contain extra text."""
-        # Try to find JSON block enclosed in curly braces
-        matches = re.findall(r"\{.*\}", response, re.DOTALL)
-
-        if matches:
-            # Return the longest JSON-like match
-            json_candidate = max(matches, key=len)
-            # Validate that it's actually valid JSON
-            try:
-                json.loads(json_candidate)
-                return json_candidate
-            except json.JSONDecodeError:
-                pass
-
+        json_candidate = find_json_object(response)
         # If no valid JSON found, return the original response
-        return response
+        return json_candidate if json_candidate is not None else response
 
-    def _create_fallback_response(self, prompt: str, error: str) -> str:
+    def _create_fallback_response(self, prompt: str, error: str) -> FallbackResponse:
         """Create a fallback response when plan generation fails."""
-        return json.dumps(
-            {
-                "original_prompt": prompt,
-                "sub_prompts": [
-                    {
-                        "id": 1,
-                        "content": f"Error occurred: {error}",
-                        "opaque_values": {},
-                        "suggested_tools": [],
-                    }
-                ],
-            }
+        return FallbackResponse(
+            dumps(
+                {
+                    "original_prompt": prompt,
+                    "sub_prompts": [
+                        {
+                            "id": 1,
+                            "content": f"Error occurred: {error}",
+                            "opaque_values": {},
+                            "suggested_tools": [],
+                        }
+                    ],
+                }
+            )
         )
 
     def close(self):
         """Close any open connections."""
         self.llm_provider.close()
 
+    async def aclose(self):
+        """Close the LLM provider, including its async client, and any pooled MCP sessions."""
+        await self.mcp_client.aclose()
+        await self.llm_provider.aclose()
+
     async def __aenter__(self):
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        self.close()
+        await self.aclose()
@@ -1,11 +1,23 @@
 """Input sanitization utilities for ShardGuard."""
 
 import re
+from functools import lru_cache
 
 from rich.console import Console
 from rich.panel import Panel
 from rich.text import Text
 
+_WHITESPACE_RE = re.compile(r"\s+")
+
+# Dangerous control characters (\x00-\x08, \x0B, \x0C, \x0E-\x1F, \x7F) mapped to None for str.translate
+_CONTROL_CHARS = dict.fromkeys([*range(0x00, 0x09), 0x0B, 0x0C, *range(0x0E, 0x20), 0x7F])
+
+
+@lru_cache(maxsize=64)
+def _compile_dangerous(pattern: str) -> re.Pattern[str]:
+    """Compile a dangerous-content pattern once, however often it is applied."""
+    return re.compile(pattern, re.IGNORECASE | re.DOTALL)
+
 
 class SanitizationResult:
     """Result of input sanitization process."""
@@ -34,14 +46,15 @@ class InputSanitizer:
         ]
 
     def sanitize(
-        self, user_input: str, show_progress: bool = True
+        self, user_input: str, show_progress: bool | None = None
     ) -> SanitizationResult:
         """
         Sanitize user input to prevent injection attacks while preserving legitimate content.
 
         Args:
             user_input: The input string to sanitize
-            show_progress: Whether to display sanitization progress to console
+            show_progress: Whether to display sanitization progress to console;
+                defaults to showing it only when the console is a terminal
 
         Returns:
             SanitizationResult containing sanitized input and metadata
@@ -49,6 +62,9 @@ class InputSanitizer:
         Raises:
             ValueError: If input is empty or only whitespace
         """
+        if show_progress is None:
+            show_progress = self.console.is_terminal
+
         if show_progress:
             self._show_sanitization_start()
             self._show_original_input(user_input)
@@ -62,7 +78,10 @@ class InputSanitizer:
 
         changes_made = []
         original_length = len(user_input)
-        sanitized = user_input
+
+        # Reject oversized input before any regex work so its cost stays bounded by max_length
+        sanitized, step_changes = self._truncate_long_input(user_input)
+        changes_made.extend(step_changes)
 
         # Apply sanitization steps
         sanitized, step_changes = self._normalize_whitespace(sanitized)
@@ -71,9 +90,6 @@ class InputSanitizer:
         sanitized, step_changes = self._remove_control_characters(sanitized)
         changes_made.extend(step_changes)
 
-        sanitized, step_changes = self._truncate_long_input(sanitized)
-        changes_made.extend(step_changes)
-
         sanitized, step_changes = self._remove_dangerous_patterns(sanitized)
         changes_made.extend(step_changes)
 
@@ -87,7 +103,7 @@ class InputSanitizer:
     def _normalize_whitespace(self, text: str) -> tuple[str, list[str]]:
         """Normalize whitespace and line endings."""
         original = text.strip()
-        normalized = re.sub(r"\s+", " ", original)
+        normalized = _WHITESPACE_RE.sub(" ", original)
 
         changes = []
         if normalized != original:
@@ -99,7 +115,7 @@ class InputSanitizer:
         """Remove potentially dangerous control characters but preserve important ones."""
         before_removal = text
         # Remove dangerous control characters but keep normal whitespace
-        cleaned = re.sub(r"[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]", "", text)
+        cleaned = text.translate(_CONTROL_CHARS)
 
         changes = []
         if cleaned != before_removal:
@@ -122,9 +138,7 @@ class InputSanitizer:
 
         for pattern, description in self.dangerous_patterns:
             before_removal = text
-            text = re.sub(
-                pattern, "", text, flags=re.IGNORECASE | re.DOTALL
-            )  # Completely remove matches
+            text = _compile_dangerous(pattern).sub("", text)  # Completely remove matches
             if text != before_removal:
                 changes.append(f"✓ Removed {description}")
 
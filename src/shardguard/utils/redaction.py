@@ -5,6 +5,12 @@ import yaml
 import hashlib
 from typing import Dict, List, Any
 
+# libyaml's loader when PyYAML was built against it; the pure-Python loader is much slower
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+
 FLAG_MAP = {
     "IGNORECASE": re.IGNORECASE,
     "MULTILINE": re.MULTILINE,
@@ -12,6 +18,14 @@ FLAG_MAP = {
     "DOTALL": re.DOTALL,
 }
 
+# Inline letters for the flags above, used to scope each rule's flags inside the union pattern
+INLINE_FLAGS = {
+    re.IGNORECASE: "i",
+    re.MULTILINE: "m",
+    re.VERBOSE: "x",
+    re.DOTALL: "s",
+}
+
 
 class Redactor:
     def __init__(
@@ -24,11 +38,12 @@ class Redactor:
         self.mask_keep = mask_keep
         self.rules_file = rules_file
         self.rules = self._load_rules()
+        self._union = self._build_union()
         self._pseudomap: Dict[str, str] = {}
 
     def _load_rules(self) -> List[Dict[str, Any]]:
         with open(self.rules_file, "r", encoding="utf-8") as f:
-            cfg = yaml.safe_load(f)
+            cfg = yaml.load(f.read(), Loader=_YamlLoader)
 
         rules = []
 
@@ -55,6 +70,29 @@ class Redactor:
 
         return rules
 
+    def _build_union(self) -> re.Pattern | None:
+        """Combine every rule into one pattern, or return None if they cannot be combined."""
+        parts = []
+        for rule in self.rules:
+            pattern = rule["pattern"]
+            flags = "".join(
+                letter for flag, letter in INLINE_FLAGS.items() if pattern.flags & flag
+            )
+            # A newline ends any trailing comment in a verbose pattern before the group closes
+            end = "\n)" if pattern.flags & re.VERBOSE else ")"
+            parts.append(f"(?{flags}:{pattern.pattern}{end}" if flags else f"(?:{pattern.pattern})")
+        try:
+            return re.compile("|".join(parts))
+        except re.error:
+            # e.g. two rules reusing a group name; fall back to checking rules one by one
+            return None
+
+    def may_match(self, text: str) -> bool:
+        """Return False only when no rule can match text, checked with one scan."""
+        if self._union is None:
+            return True
+        return self._union.search(text) is not None
+
     def _hash(self, value: str) -> str:
         return hashlib.sha256(value.encode("utf-8")).hexdigest()[:12]
 
@@ -83,6 +121,8 @@ class Redactor:
             return f"<REDACTED:{kind}>"
 
     def redact(self, text: str) -> str:
+        if not self.may_match(text):
+            return text
         for rule in self.rules:
             kind = rule["kind"]
             pattern = rule["pattern"]
@@ -0,0 +1,127 @@
+"""JSON helpers that use orjson when it is installed."""
+
+import json
+import re
+from typing import Any
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(obj: Any, indent: bool = False) -> str:
+    """Serialize obj to a JSON string, indented by two spaces when indent is set."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0).decode()
+    return json.dumps(obj, indent=2 if indent else None, ensure_ascii=False)
+
+
+def loads(data: str | bytes) -> Any:
+    """Parse a JSON document; invalid input raises json.JSONDecodeError either way."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+# Characters that can change brace depth or string state; everything else is skipped in C
+_JSON_STRUCTURE_RE = re.compile(r'[{}"\\]')
+
+
+def _balanced_object_end(text: str, start: int) -> int:
+    """Return the index just past the object opened at text[start], or -1 if it never closes."""
+    depth = 0
+    in_string = False
+    escaped_at = -1
+    for match in _JSON_STRUCTURE_RE.finditer(text, start):
+        char, pos = match.group(), match.start()
+        if in_string:
+            if pos == escaped_at:
+                continue
+            if char == "\\":
+                escaped_at = pos + 1
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                return pos + 1
+    return -1
+
+
+class JSONObjectScanner:
+    """Brace-depth scan that carries its state across streamed chunks.
+
+    feed() returns the first complete top-level object that parses, so the
+    caller can stop reading the stream as soon as the object is closed.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self._pos = 0
+        self._start = -1
+        self._depth = 0
+        self._in_string = False
+        self._escaped_at = -1
+
+    def feed(self, chunk: str) -> str | None:
+        self.text += chunk
+        for match in _JSON_STRUCTURE_RE.finditer(self.text, self._pos):
+            char, pos = match.group(), match.start()
+            if self._in_string:
+                if pos == self._escaped_at:
+                    continue
+                if char == "\\":
+                    self._escaped_at = pos + 1
+                elif char == '"':
+                    self._in_string = False
+            elif self._depth == 0:
+                # Outside an object only an opening brace matters; the rest is prose
+                if char == "{":
+                    self._start = pos
+                    self._depth = 1
+            elif char == '"':
+                self._in_string = True
+            elif char == "{":
+                self._depth += 1
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    candidate = self.text[self._start:pos + 1]
+                    try:
+                        loads(candidate)
+                        return candidate
+                    except json.JSONDecodeError:
+                        pass
+        self._pos = len(self.text)
+        return None
+
+
+def find_json_object(text: str) -> str | None:
+    """Return the first balanced {...} span in text that parses as JSON, or None."""
+    # A bare object needs one parse and no scan
+    stripped = text.strip()
+    if stripped.startswith("{"):
+        try:
+            loads(stripped)
+            return stripped
+        except json.JSONDecodeError:
+            pass
+
+    # Walk each "{" to its balanced "}" and return the first span that parses
+    start = text.find("{")
+    while start != -1:
+        end = _balanced_object_end(text, start)
+        if end == -1:
+            return None
+        candidate = text[start:end]
+        try:
+            loads(candidate)
+            return candidate
+        except json.JSONDecodeError:
+            start = text.find("{", start + 1)
+    return None
@@ -1,14 +1,32 @@
-from jsonschema import validate as jsonschema_validate, ValidationError
-from typing import Any, Dict, Optional
+from typing import Any
 
-def _validate_output(output: Any, schema: Optional[Dict[str, Any]], where) -> None:
+from jsonschema import ValidationError
+from jsonschema.exceptions import best_match
+from jsonschema.validators import validator_for
+
+# Compiled validators keyed by schema identity. The schema itself is kept in the
+# entry so its id cannot be recycled by another object while it is cached.
+_VALIDATORS: dict[int, tuple[dict[str, Any], Any]] = {}
+_MAX_CACHED_VALIDATORS = 64
+
+def _validator_for(schema: dict[str, Any]):
+    """Return a compiled validator for the schema, building it on first use."""
+    entry = _VALIDATORS.get(id(schema))
+    if entry is None or entry[0] is not schema:
+        if len(_VALIDATORS) >= _MAX_CACHED_VALIDATORS:
+            _VALIDATORS.clear()
+        cls = validator_for(schema)
+        cls.check_schema(schema)
+        entry = _VALIDATORS[id(schema)] = (schema, cls(schema))
+    return entry[1]
+
+def _validate_output(output: Any, schema: dict[str, Any] | None, where) -> None:
     """
     Added a schema validation for the output generated so as 
     to make the LLM responses as deterministic as possible
     """
     if not schema:
         return
-    try:
-        jsonschema_validate(instance=output, schema=schema)
-    except ValidationError as e:
-        raise RuntimeError(f"{where} output failed schema validation: {e.message}") from e
\ No newline at end of file
+    error: ValidationError | None = best_match(_validator_for(schema).iter_errors(output))
+    if error is not None:
+        raise RuntimeError(f"{where} output failed schema validation: {error.message}") from error
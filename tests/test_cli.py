@@ -7,6 +7,7 @@ import typer
 from typer.testing import CliRunner
 
 from shardguard.cli import app, create_planner
+from shardguard.core.mcp_integration import MCPConnectionError
 
 
 class TestCreatePlanner:
@@ -15,37 +16,55 @@ class TestCreatePlanner:
     @pytest.mark.asyncio
     async def test_create_planner_success(self):
         """Test successful planner creation and cleanup."""
-        with patch("shardguard.cli.PlanningLLM") as mock_planning_llm_class:
+        with patch("shardguard.core.planning.PlanningLLM") as mock_planning_llm_class:
             mock_planner = Mock()
             mock_planner.get_available_tools_description = AsyncMock(
                 return_value="Available MCP Tools:\n\nServer: test-server\n• test-tool"
             )
-            mock_planner.close = Mock()
+            mock_planner.aclose = AsyncMock()
             mock_planning_llm_class.return_value = mock_planner
 
             async with create_planner() as planner:
                 assert planner == mock_planner
-                mock_planner.get_available_tools_description.assert_called_once()
 
-            mock_planner.close.assert_called_once()
+            # The connectivity probe runs in the background and is awaited on exit
+            mock_planner.get_available_tools_description.assert_awaited_once()
+            mock_planner.aclose.assert_awaited_once()
 
     @pytest.mark.asyncio
     async def test_create_planner_with_connection_error(self):
         """Test planner creation when MCP connection fails."""
-        with patch("shardguard.cli.PlanningLLM") as mock_planning_llm_class:
+        with patch("shardguard.core.planning.PlanningLLM") as mock_planning_llm_class:
             mock_planner = Mock()
             mock_planner.get_available_tools_description = AsyncMock(
                 side_effect=Exception("Connection failed")
             )
-            mock_planner.close = Mock()
+            mock_planner.aclose = AsyncMock()
             mock_planning_llm_class.return_value = mock_planner
 
             async with create_planner() as planner:
                 assert planner == mock_planner
 
-            mock_planner.close.assert_called_once()
+            mock_planner.aclose.assert_awaited_once()
 
 
+    @pytest.mark.asyncio
+    async def test_create_planner_propagates_command_errors(self):
+        """Test that errors raised inside the context reach the caller."""
+        with patch("shardguard.core.planning.PlanningLLM") as mock_planning_llm_class:
+            mock_planner = Mock()
+            mock_planner.get_available_tools_description = AsyncMock(
+                return_value="No MCP tools available."
+            )
+            mock_planner.aclose = AsyncMock()
+            mock_planning_llm_class.return_value = mock_planner
+
+            with pytest.raises(ValueError, match="planning failed"):
+                async with create_planner():
+                    raise ValueError("planning failed")
+
+            mock_planner.aclose.assert_awaited_once()
+
 class TestCLICommands:
     """Test CLI commands using proper mocking without global state."""
 
@@ -129,7 +148,7 @@ class TestCLICommands:
     def test_plan_command_success(self):
         """Test plan command successful execution."""
         with patch("shardguard.cli.create_planner") as mock_create_planner:
-            with patch("shardguard.cli.CoordinationService") as mock_coord_service:
+            with patch("shardguard.core.coordination.CoordinationService") as mock_coord_service:
                 mock_context_manager, mock_planner = self._create_mock_planner_context(
                     "Available MCP Tools:\n\nServer: file-server"
                 )
@@ -138,15 +157,50 @@ class TestCLICommands:
                 # Mock coordination service instance
                 mock_coord = Mock()
                 mock_plan_obj = Mock()
-                mock_plan_obj.model_dump_json.return_value = '{"plan": "test"}'
+                mock_plan_obj.model_dump.return_value = {
+                    "original_prompt": "write hello to file",
+                    "sub_prompts": [
+                        {
+                            "id": 1,
+                            "content": "write hello to file",
+                            "suggested_tools": ["file-server.write_file"],
+                        }
+                    ],
+                }
                 mock_coord.handle_prompt = AsyncMock(return_value=mock_plan_obj)
+                mock_coord.handle_subtasks = AsyncMock()
+                mock_coord.__aenter__ = AsyncMock(return_value=mock_coord)
+                mock_coord.__aexit__ = AsyncMock(return_value=None)
                 mock_coord_service.return_value = mock_coord
 
                 result = self.runner.invoke(app, ["plan", "write hello to file"])
 
                 assert result.exit_code == 0
-                assert '{"plan": "test"}' in result.stdout
+                assert '"original_prompt": "write hello to file"' in result.stdout
                 mock_coord.handle_prompt.assert_called_once_with("write hello to file")
+                mock_coord.__aexit__.assert_awaited_once()
+
+    def test_plan_command_reports_missing_plan(self):
+        """Test that a prompt the planner could not plan exits with an error."""
+        with patch("shardguard.cli.create_planner") as mock_create_planner:
+            with patch("shardguard.core.coordination.CoordinationService") as mock_coord_service:
+                mock_context_manager, _ = self._create_mock_planner_context(
+                    "Available MCP Tools:\n\nServer: file-server"
+                )
+                mock_create_planner.return_value = mock_context_manager
+
+                mock_coord = Mock()
+                mock_coord.handle_prompt = AsyncMock(return_value=None)
+                mock_coord.handle_subtasks = AsyncMock()
+                mock_coord.__aenter__ = AsyncMock(return_value=mock_coord)
+                mock_coord.__aexit__ = AsyncMock(return_value=None)
+                mock_coord_service.return_value = mock_coord
+
+                result = self.runner.invoke(app, ["plan", "write hello to file"])
+
+                assert result.exit_code == 1
+                assert "No plan produced" in result.stdout
+                mock_coord.handle_subtasks.assert_not_called()
 
     def test_plan_command_gemini_no_api_key(self):
         """Test plan command with Gemini provider but no API key."""
@@ -214,6 +268,25 @@ class TestHelperFunctions:
         # Should not raise exception for non-Gemini providers
         _validate_gemini_api_key("ollama", None)
 
+    @pytest.mark.parametrize(
+        "error, expected",
+        [
+            (ConnectionError("refused"), "ollama serve"),
+            (MCPConnectionError("Lost connection to MCP server file-server"), "MCP Server Error"),
+        ],
+    )
+    def test_handle_errors_tells_mcp_failures_from_provider_failures(self, error, expected, capsys):
+        """Test that a lost MCP server is not reported with the LLM provider hint."""
+        from shardguard.cli import _handle_errors
+
+        with pytest.raises(typer.Exit):
+            _handle_errors(error, "ollama")
+
+        output = capsys.readouterr().out
+        assert expected in output
+        if isinstance(error, MCPConnectionError):
+            assert "ollama serve" not in output
+
     def test_get_model_for_provider_explicit(self):
         """Test model selection with explicit model."""
         from shardguard.cli import _get_model_for_provider
@@ -1,11 +1,18 @@
 """Tests for ShardGuard coordination functionality."""
 
-from unittest.mock import Mock, patch
+import asyncio
+from unittest.mock import AsyncMock, Mock, patch
 
 import pytest
 
-from shardguard.core.coordination import CoordinationService
+from shardguard.core.coordination import RULES_FILE, CoordinationService
+from shardguard.core.llm_providers import FallbackResponse
+from shardguard.core.mcp_integration import MCPClient
 from shardguard.core.models import Plan
+from shardguard.utils.redaction import Redactor
+
+# Loaded once, so tests that stub the service's redactor never depend on file access or test order
+REDACTOR = Redactor(str(RULES_FILE), strategy="pseudonymize")
 
 
 class MockPlanningLLM:
@@ -115,7 +122,7 @@ class TestCoordinationService:
         """Test handling prompts with various responses."""
         mock_planner = MockPlanningLLM(json_response.strip())
 
-        with patch("builtins.open", Mock()):
+        with patch("shardguard.core.coordination._load_redactor", return_value=REDACTOR):
             service = CoordinationService(mock_planner)
 
             result = await service.handle_prompt("Hello world")
@@ -138,7 +145,7 @@ class TestCoordinationService:
             return_value='{"original_prompt": "test", "sub_prompts": []}'
         )
 
-        with patch("builtins.open", Mock()):
+        with patch("shardguard.core.coordination._load_redactor", return_value=REDACTOR):
             service = CoordinationService(mock_planner)
 
             await service.handle_prompt("user input")
@@ -154,7 +161,7 @@ class TestCoordinationService:
         """Test the _format_prompt method."""
         mock_planner = MockPlanningLLM()
 
-        with patch("builtins.open", Mock()):
+        with patch("shardguard.core.coordination._load_redactor", return_value=REDACTOR):
             service = CoordinationService(mock_planner)
 
             formatted = service._format_prompt("test input")
@@ -170,7 +177,7 @@ class TestCoordinationService:
         """Test handling of invalid JSON from planner."""
         mock_planner = MockPlanningLLM("invalid json response")
 
-        with patch("builtins.open", Mock()):
+        with patch("shardguard.core.coordination._load_redactor", return_value=REDACTOR):
             service = CoordinationService(mock_planner)
 
             with pytest.raises(Exception):  # Should raise validation error
@@ -182,7 +189,7 @@ class TestCoordinationService:
         incomplete_json = '{"original_prompt": "test"}'  # Missing sub_prompts
         mock_planner = MockPlanningLLM(incomplete_json)
 
-        with patch("builtins.open", Mock()):
+        with patch("shardguard.core.coordination._load_redactor", return_value=REDACTOR):
             service = CoordinationService(mock_planner)
 
             with pytest.raises(Exception):  # Should raise validation error
@@ -199,7 +206,7 @@ class TestCoordinationService:
         """
         mock_planner = MockPlanningLLM(json_response.strip())
 
-        with patch("builtins.open", Mock()):
+        with patch("shardguard.core.coordination._load_redactor", return_value=REDACTOR):
             service = CoordinationService(mock_planner)
 
             result = await service.handle_prompt("Simple task")
@@ -207,3 +214,315 @@ class TestCoordinationService:
         assert isinstance(result, Plan)
         assert result.original_prompt == "Simple task"
         assert result.sub_prompts == []
+
+    @pytest.mark.asyncio
+    async def test_check_tool_caches_tool_names(self):
+        """Test that check_tool lists MCP tools once and validates every suggested tool."""
+        service = CoordinationService(MockPlanningLLM())
+        with patch(
+            "shardguard.core.mcp_integration.MCPClient.list_tool_names",
+            new=AsyncMock(return_value=["file-server.read_file", "web-server.fetch"]),
+        ) as mock_list:
+            assert await service.check_tool(["file-server.read_file"]) is True
+            assert await service.check_tool(["file-server.read_file", "nope.tool"]) is False
+            assert await service.check_tool([]) is True
+
+        mock_list.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_handle_prompt_reuses_cached_plan(self):
+        """Test that a repeated prompt is answered from the plan cache."""
+        mock_planner = MockPlanningLLM()
+        mock_planner.generate_plan = AsyncMock(return_value=mock_planner.response)
+        service = CoordinationService(mock_planner)
+
+        first = await service.handle_prompt("repeat me")
+        second = await service.handle_prompt("repeat me")
+
+        assert first == second
+        mock_planner.generate_plan.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_handle_prompt_does_not_cache_fallback_plan(self):
+        """Test that the stand-in plan for a failed Planning LLM call is not replayed."""
+        fallback = FallbackResponse('{"original_prompt": "p", "sub_prompts": [{"id": 1, "content": "Error occurred: timeout"}]}')
+        mock_planner = MockPlanningLLM()
+        mock_planner.generate_plan = AsyncMock(side_effect=[fallback, mock_planner.response])
+        service = CoordinationService(mock_planner)
+
+        first = await service.handle_prompt("repeat me")
+        second = await service.handle_prompt("repeat me")
+
+        assert first.sub_prompts[0].content == "Error occurred: timeout"
+        assert second.original_prompt == "test"
+        assert mock_planner.generate_plan.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_handle_prompt_replans_when_cached_plan_is_invalid(self, tmp_path):
+        """Test that a corrupt persisted plan is replaced rather than returned."""
+        from shardguard.core.plan_cache import FilePlanCache, plan_cache_key
+
+        mock_planner = MockPlanningLLM()
+        mock_planner.generate_plan = AsyncMock(return_value=mock_planner.response)
+        cache = FilePlanCache(tmp_path)
+        key = plan_cache_key("", "repeat me")
+        await cache.set(key, '{"not": "a plan"}')
+        service = CoordinationService(mock_planner, plan_cache=cache)
+
+        plan = await service.handle_prompt("repeat me")
+
+        assert plan.original_prompt == "test"
+        mock_planner.generate_plan.assert_awaited_once()
+        assert '"original_prompt":"test"' in await cache.get(key)
+
+    @pytest.mark.asyncio
+    async def test_handle_prompt_never_persists_opaque_values(self, tmp_path):
+        """Test that plans holding sensitive values are not written to a file cache."""
+        from shardguard.core.plan_cache import FilePlanCache
+
+        response = '{"original_prompt": "p", "sub_prompts": [{"id": 1, "content": "mail bob@example.com"}]}'
+        mock_planner = MockPlanningLLM(response)
+        mock_planner.generate_plan = AsyncMock(return_value=response)
+        service = CoordinationService(mock_planner, plan_cache=FilePlanCache(tmp_path))
+
+        await service.handle_prompt("mail bob")
+        await service.handle_prompt("mail bob")
+
+        cached = "".join(p.read_text() for p in tmp_path.iterdir())
+        assert "bob@example.com" not in cached
+        assert mock_planner.generate_plan.await_count == 2
+
+        mock_planner.generate_plan.return_value = '{"original_prompt": "p", "sub_prompts": []}'
+        await service.handle_prompt("say hi")
+        assert len(list(tmp_path.iterdir())) == 1
+
+    @pytest.mark.asyncio
+    async def test_handle_prompt_never_persists_fallback_plan(self, tmp_path):
+        """Test that a failed Planning LLM call leaves nothing in a file cache, and plans can be forgotten."""
+        from shardguard.core.plan_cache import FilePlanCache
+
+        fallback = FallbackResponse('{"original_prompt": "p", "sub_prompts": [{"id": 1, "content": "Error occurred: timeout"}]}')
+        mock_planner = MockPlanningLLM()
+        mock_planner.generate_plan = AsyncMock(return_value=fallback)
+        service = CoordinationService(mock_planner, plan_cache=FilePlanCache(tmp_path))
+
+        await service.handle_prompt("say hi")
+        assert list(tmp_path.iterdir()) == []
+
+        mock_planner.generate_plan.return_value = mock_planner.response
+        await service.handle_prompt("say hi")
+        assert len(list(tmp_path.iterdir())) == 1
+
+        await service.forget_plan("say hi")
+        assert list(tmp_path.iterdir()) == []
+
+    @pytest.mark.asyncio
+    async def test_handle_prompt_retries_until_tools_are_valid(self):
+        """Test that with strict checking a plan with unknown tools is regenerated."""
+        bad = '{"original_prompt": "p", "sub_prompts": [{"id": 1, "content": "c", "suggested_tools": ["nope.tool"]}]}'
+        good = '{"original_prompt": "p", "sub_prompts": [{"id": 1, "content": "c", "suggested_tools": ["file-server.read_file"]}]}'
+        mock_planner = MockPlanningLLM()
+        mock_planner.generate_plan = AsyncMock(side_effect=[bad, good])
+        service = CoordinationService(mock_planner, strict_tool_check=True)
+
+        with (
+            patch(
+                "shardguard.core.mcp_integration.MCPClient.list_tool_names",
+                new=AsyncMock(return_value=["file-server.read_file"]),
+            ),
+            patch("shardguard.core.coordination.asyncio.sleep", new=AsyncMock()),
+        ):
+            result = await service.handle_prompt("read the file")
+
+        assert result is not None
+        assert result.sub_prompts[0].suggested_tools == ["file-server.read_file"]
+        assert mock_planner.generate_plan.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_context_manager_leaves_mcp_client_to_planner(self):
+        """Test that the shared MCP client is closed by the planner and not by the service."""
+        from shardguard.core.planning import PlanningLLM
+
+        with patch(
+            "shardguard.core.mcp_integration.MCPClient.aclose", new=AsyncMock()
+        ) as mock_aclose:
+            async with PlanningLLM() as planner:
+                async with CoordinationService(planner) as service:
+                    assert service._mcp_client() is planner.mcp_client
+                mock_aclose.assert_not_awaited()
+
+        mock_aclose.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_context_manager_closes_mcp_client_it_opened(self):
+        """Test that without a shared MCP client the service opens one and closes it on exit."""
+        with patch(
+            "shardguard.core.mcp_integration.MCPClient.aclose", new=AsyncMock()
+        ) as mock_aclose:
+            async with CoordinationService(MockPlanningLLM()) as service:
+                assert isinstance(service._mcp_client(), MCPClient)
+                mock_aclose.assert_not_awaited()
+
+        mock_aclose.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_handle_prompt_redacts_subprompt_content(self):
+        """Test that sensitive values are swapped out of the content and recorded once."""
+        response = '{"original_prompt": "p", "sub_prompts": [{"id": 1, "content": "mail bob@example.com then bob@example.com"}]}'
+        service = CoordinationService(MockPlanningLLM(response))
+
+        result = await service.handle_prompt("mail bob")
+
+        sub = result.sub_prompts[0]
+        assert "bob@example.com" not in sub.content
+        pseudonym = sub.opaque_values["bob@example.com"]
+        assert sub.content == f"mail {pseudonym} then {pseudonym}"
+
+    @pytest.mark.asyncio
+    async def test_execute_step_tools_skips_unknown_tools(self):
+        """Test that only tools that exist are dispatched to their MCP server."""
+        from shardguard.core.execution import LLMStepResponse, ToolCall
+
+        service = CoordinationService(MockPlanningLLM())
+        resp = LLMStepResponse(
+            tool_calls=[
+                ToolCall(server="file-server", tool="read_file", args={"path": "a.txt"}),
+                ToolCall(server="file-server", tool="made_up", args={}),
+            ]
+        )
+        with (
+            patch(
+                "shardguard.core.mcp_integration.MCPClient.list_tool_names",
+                new=AsyncMock(return_value=["file-server.read_file"]),
+            ),
+            patch(
+                "shardguard.core.mcp_integration.MCPClient.call_tools_batch",
+                new=AsyncMock(return_value=["contents"]),
+            ) as mock_batch,
+        ):
+            await service._execute_step_tools({}, resp)
+
+        mock_batch.assert_awaited_once_with("file-server", [("read_file", {"path": "a.txt"})])
+
+    @pytest.mark.asyncio
+    async def test_call_tools_batches_per_server_in_order(self):
+        """Test that MCPClient.call_tools groups calls by server and keeps their order."""
+        from shardguard.core.mcp_integration import MCPClient
+
+        async def fake_batch(server, calls):
+            return [f"{server}:{tool}" for tool, _ in calls]
+
+        client = MCPClient()
+        with patch.object(client, "call_tools_batch", side_effect=fake_batch) as mock_batch:
+            results = await client.call_tools(
+                [
+                    ("file-server", "read_file", {}),
+                    ("web-server", "fetch", {}),
+                    ("file-server", "write_file", {}),
+                ]
+            )
+
+        assert results == ["file-server:read_file", "web-server:fetch", "file-server:write_file"]
+        assert mock_batch.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_handle_subtasks_shares_one_execution_llm(self):
+        """Test that every subtask goes through a single Execution LLM client."""
+        exec_llm = Mock()
+        exec_llm.propose_tool_intents = AsyncMock(return_value=[])
+        service = CoordinationService(MockPlanningLLM())
+        tasks = [
+            {"id": 1, "content": "first", "suggested_tools": []},
+            {"id": 2, "content": "second", "suggested_tools": []},
+        ]
+
+        with (
+            patch(
+                "shardguard.core.coordination.make_execution_llm", return_value=exec_llm
+            ) as mock_factory,
+            patch(
+                "shardguard.core.mcp_integration.MCPClient.list_tool_names",
+                new=AsyncMock(return_value=[]),
+            ),
+        ):
+            await service.handle_subtasks(tasks, "ollama", "llama3.2", None)
+
+        mock_factory.assert_called_once()
+        assert exec_llm.propose_tool_intents.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_handle_subtasks_cancels_remaining_steps_on_failure(self):
+        """Test that when one subtask fails the ones still running are cancelled, not left behind."""
+        cancelled = []
+
+        async def propose(step_content, suggested_tools):
+            if step_content == "fails":
+                raise RuntimeError("Execution LLM failed")
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(step_content)
+                raise
+
+        exec_llm = Mock()
+        exec_llm.propose_tool_intents = propose
+        service = CoordinationService(MockPlanningLLM())
+        tasks = [
+            {"id": 1, "content": "slow", "suggested_tools": []},
+            {"id": 2, "content": "fails", "suggested_tools": []},
+        ]
+
+        with patch("shardguard.core.coordination.make_execution_llm", return_value=exec_llm):
+            with pytest.raises(RuntimeError, match="Execution LLM failed"):
+                await service.handle_subtasks(tasks, "ollama", "llama3.2", None)
+
+        assert cancelled == ["slow"]
+
+    @pytest.mark.asyncio
+    async def test_langchain_single_tool_step_gets_arguments_without_agent(self):
+        """Test that a one-tool step skips the agent and dispatches only that tool, with the arguments the Execution LLM filled in."""
+        intent = {"server": "file-server", "tool": "read_file", "args": {"path": "a.txt"}}
+        other = {"server": "file-server", "tool": "write_file", "args": {"path": "a.txt"}}
+        exec_llm = Mock()
+        exec_llm.propose_tool_intents = AsyncMock(return_value=[intent, other])
+        service = CoordinationService(MockPlanningLLM())
+        task = {"id": 1, "content": "read a.txt", "suggested_tools": ["file-server.read_file"]}
+
+        with (
+            patch("shardguard.core.coordination.make_execution_llm", return_value=exec_llm),
+            patch("shardguard.core.execution_langchain.make_execution_agent") as mock_agent,
+            patch(
+                "shardguard.core.mcp_integration.MCPClient.list_tool_names",
+                new=AsyncMock(return_value=["file-server.read_file", "file-server.write_file"]),
+            ),
+            patch(
+                "shardguard.core.mcp_integration.MCPClient.call_tools_batch",
+                new=AsyncMock(return_value=["contents"]),
+            ) as mock_batch,
+        ):
+            await service.handle_subtasks_langchain([task], "ollama", "llama3.2", None)
+
+        mock_agent.assert_not_called()
+        exec_llm.propose_tool_intents.assert_awaited_once_with(
+            step_content="read a.txt", suggested_tools=["file-server.read_file"]
+        )
+        mock_batch.assert_awaited_once_with("file-server", [("read_file", {"path": "a.txt"})])
+
+    @pytest.mark.asyncio
+    async def test_langchain_step_without_tools_executes_nothing(self):
+        """Test that a step suggesting no tools neither calls the Execution LLM nor any tool."""
+        exec_llm = Mock()
+        exec_llm.propose_tool_intents = AsyncMock(return_value=[])
+        service = CoordinationService(MockPlanningLLM())
+        task = {"id": 1, "content": "say hi", "suggested_tools": []}
+
+        with (
+            patch("shardguard.core.coordination.make_execution_llm", return_value=exec_llm),
+            patch("shardguard.core.execution_langchain.make_execution_agent") as mock_agent,
+            patch("shardguard.core.mcp_integration.MCPClient.call_tools_batch", new=AsyncMock()) as mock_batch,
+        ):
+            await service.handle_subtasks_langchain([task], "ollama", "llama3.2", None)
+
+        mock_agent.assert_not_called()
+        exec_llm.propose_tool_intents.assert_not_awaited()
+        mock_batch.assert_not_awaited()
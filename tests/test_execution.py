@@ -0,0 +1,141 @@
+"""Tests for ShardGuard execution functionality."""
+
+import asyncio
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+
+from shardguard.core.execution import (
+    GenericExecutionLLM,
+    StepExecutor,
+    _build_exec_prompt,
+    _extract_json_array,
+    aclose_execution_llms,
+    make_execution_llm,
+)
+
+INTENT = {"server": "file-server", "tool": "read_file", "args": {"path": "a.txt"}}
+
+
+class TestExtractJsonArray:
+    """Test cases for _extract_json_array."""
+
+    @pytest.mark.parametrize(
+        "text",
+        [
+            '[{"server": "file-server", "tool": "read_file", "args": {"path": "a.txt"}}]',
+            '```json\n[{"server": "file-server", "tool": "read_file", "args": {"path": "a.txt"}}]\n```',
+            'Here you go: [{"server": "file-server", "tool": "read_file", "args": {"path": "a.txt"}}] done.',
+            'Note [1] first: [{"server": "file-server", "tool": "read_file", "args": {"path": "a.txt"}}] end',
+            'See [docs]: ```json\n[{"server": "file-server", "tool": "read_file", "args": {"path": "a.txt"}}]\n``` or [x',
+        ],
+    )
+    def test_extracts_intents(self, text):
+        """Test that the intents are found whether or not prose surrounds them."""
+        assert _extract_json_array(text) == [INTENT]
+
+    def test_returns_empty_list_without_array(self):
+        """Test that replies without a JSON array yield no intents."""
+        assert _extract_json_array("I cannot help with that.") == []
+
+    def test_returns_empty_list_for_non_array_json(self):
+        """Test that a reply that is a whole JSON object yields no intents."""
+        assert _extract_json_array('{"intents": [{"server": "s", "tool": "t"}]}') == []
+
+    def test_drops_intents_outside_schema(self):
+        """Test that intents failing schema validation are dropped and the valid ones kept."""
+        text = (
+            '[{"server": "s", "tool": "t", "extra": 1}, '
+            '{"server": "file-server", "tool": "read_file", "args": {"path": "a.txt"}}, '
+            '{"tool": "no_server"}]'
+        )
+        assert _extract_json_array(text) == [INTENT]
+
+    def test_bracket_heavy_prose_without_array(self):
+        """Test that prose full of unclosed brackets is scanned without finding intents."""
+        assert _extract_json_array("x [{ " * 20000 + "}") == []
+
+    def test_rejects_non_string(self):
+        """Test that non-string replies are refused."""
+        with pytest.raises(ValueError, match="non-string"):
+            _extract_json_array(None)
+
+
+class TestStepExecutor:
+    """Test cases for StepExecutor."""
+
+    @pytest.mark.asyncio
+    async def test_run_steps_keeps_order_and_limits_concurrency(self):
+        """Test that steps overlap up to max_concurrency and results follow step order."""
+        in_flight = 0
+        peak = 0
+
+        async def propose(*, step_content, suggested_tools):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return [{"server": "file-server", "tool": step_content}]
+
+        exec_llm = Mock()
+        exec_llm.propose_tool_intents = propose
+        executor = StepExecutor(exec_llm, max_concurrency=2)
+
+        responses = await executor.run_steps([{"content": f"tool{i}"} for i in range(5)])
+
+        assert [r.tool_calls[0].tool for r in responses] == [f"tool{i}" for i in range(5)]
+        assert peak == 2
+
+
+class TestGenericExecutionLLM:
+    """Test cases for GenericExecutionLLM."""
+
+    @pytest.mark.asyncio
+    async def test_stops_reading_once_intents_are_complete(self):
+        """Test that the stream is abandoned as soon as a valid intent array has arrived."""
+        consumed = []
+
+        async def stream(prompt):
+            for chunk in ['[{"server": "file-server", ', '"tool": "read_file", ', '"args": {"path": "a.txt"}}]', " trailing prose"]:
+                consumed.append(chunk)
+                yield chunk
+
+        llm = GenericExecutionLLM()
+        llm.llm_provider = Mock()
+        llm.llm_provider.generate_response_stream = stream
+
+        intents = await llm.propose_tool_intents(step_content="read a.txt", suggested_tools=["file-server.read_file"])
+
+        assert intents == [INTENT]
+        assert len(consumed) == 3
+
+
+def test_make_execution_llm_reuses_instances():
+    """Test that the factory hands out one instance per argument set."""
+    first = make_execution_llm("ollama", "llama3.2")
+
+    assert make_execution_llm("ollama", "llama3.2") is first
+    assert make_execution_llm("ollama", "llama3.1") is not first
+
+
+@pytest.mark.asyncio
+async def test_aclose_execution_llms_closes_and_forgets_instances():
+    """Test that the shutdown hook closes cached instances and later calls get new ones."""
+    first = make_execution_llm("ollama", "llama3.2")
+
+    with patch.object(first, "aclose", new=AsyncMock()) as mock_aclose:
+        await aclose_execution_llms()
+
+    mock_aclose.assert_awaited_once()
+    assert make_execution_llm("ollama", "llama3.2") is not first
+
+
+def test_build_exec_prompt_accepts_unhashable_tools():
+    """Test that tool specs that cannot key the prompt cache still produce a prompt."""
+    tools = [{"name": "file-server.read_file"}]
+
+    prompt = _build_exec_prompt("read a.txt", tools)
+
+    assert "Suggested Tools: [{'name': 'file-server.read_file'}]" in prompt
+    assert _build_exec_prompt("read a.txt", ["a.b"]) == _build_exec_prompt("read a.txt", ["a.b"])
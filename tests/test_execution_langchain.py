@@ -1,6 +1,7 @@
 """Tests for the execution module."""
 
 import json
+import logging
 from unittest.mock import AsyncMock, Mock, patch
 
 import pytest
@@ -10,9 +11,8 @@ from langchain.agents import AgentType
 from shardguard.core.execution_langchain import (
     GenericExecutionLLMWrapper,
     ToolsWrapper,
-    make_langchain_tools,
+    log_tool_call,
     make_execution_agent,
-    EXEC_SYSTEM_PROMPT,
 )
 
 
@@ -158,6 +158,18 @@ class TestToolsWrapper:
         assert output["tool"] == "read-file"
         assert "args" in output
 
+    def test_tools_wrapper_binds_each_tool_to_its_own_route(self):
+        """Test that every wrapped tool reports its own server and tool."""
+        result = ToolsWrapper(["file-server.read-file", "database-server.query", "standalone-tool"])
+
+        routes = [(t.func()["server"], t.func()["tool"]) for t in result]
+
+        assert routes == [
+            ("file-server", "read-file"),
+            ("database-server", "query"),
+            ("unknown-server", "standalone-tool"),
+        ]
+
     def test_tools_wrapper_tool_with_multiple_dots(self):
         """Test tool name with multiple dots."""
         tools_list = ["complex-server.sub.read-file"]
@@ -167,6 +179,44 @@ class TestToolsWrapper:
         assert len(result) == 1
         assert result[0].name == "sub.read-file"
 
+
+class TestLogToolCall:
+    """Test the log_tool_call decorator."""
+
+    @pytest.mark.asyncio
+    async def test_logs_nothing_when_debug_off(self):
+        """Test that the wrapper only passes the call through unless debug logging is enabled."""
+
+        async def tool(**kwargs):
+            return kwargs
+
+        logger = logging.getLogger("shardguard.core.execution_langchain.tools")
+        with patch.object(logger, "isEnabledFor", return_value=False), \
+                patch.object(logger, "debug") as mock_debug:
+            result = await log_tool_call(tool)(path="a.txt")
+
+        assert result == {"path": "a.txt"}
+        mock_debug.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_logs_call_and_result_when_debug_on(self):
+        """Test that the wrapper logs the call and passes the result through."""
+
+        async def tool(**kwargs):
+            return {"ok": True}
+
+        logger = logging.getLogger("shardguard.core.execution_langchain.tools")
+        wrapped = log_tool_call(tool)
+        # Enabled only after decoration, as when the CLI configures logging after import
+        with patch.object(logger, "isEnabledFor", return_value=True), \
+                patch.object(logger, "debug") as mock_debug:
+            result = await wrapped(path="a.txt")
+
+        assert wrapped is not tool
+        assert wrapped.__name__ == "tool"
+        assert result == {"ok": True}
+        assert mock_debug.call_count == 2
+
 class TestMakeExecutionAgent:
     """Test the make_execution_agent function."""
 
@@ -1,7 +1,8 @@
 """Tests for LLM providers."""
 
+import asyncio
 import os
-from unittest.mock import MagicMock, Mock, patch
+from unittest.mock import AsyncMock, MagicMock, Mock, patch
 
 import pytest
 
@@ -63,6 +64,108 @@ class TestOllamaProvider:
             assert response == "test response"
             mock_client.post.assert_called_once()
 
+    @pytest.mark.asyncio
+    async def test_generate_response_uses_async_client(self):
+        """Test that async generation goes through the async client, not the blocking one."""
+        mock_httpx = Mock()
+        mock_client = MagicMock()
+        mock_response = MagicMock()
+        mock_response.json.return_value = {"response": "test response"}
+        mock_async_client = MagicMock()
+        mock_async_client.post = AsyncMock(return_value=mock_response)
+        mock_httpx.Client.return_value = mock_client
+        mock_httpx.AsyncClient.return_value = mock_async_client
+
+        with patch.dict("sys.modules", {"httpx": mock_httpx}):
+            provider = OllamaProvider()
+            response = await provider.generate_response("test prompt")
+
+        assert response == "test response"
+        mock_async_client.post.assert_awaited_once()
+        assert mock_async_client.post.call_args.kwargs["json"]["stream"] is False
+        mock_client.post.assert_not_called()
+
+
+    @pytest.mark.asyncio
+    async def test_generate_response_stream_yields_chunks(self):
+        """Test that streamed NDJSON lines are yielded as response chunks."""
+        lines = [
+            '{"response": "[{", "done": false}',
+            '',
+            '{"response": "}]", "done": false}',
+            '{"response": "", "done": true}',
+        ]
+
+        async def aiter_lines():
+            for line in lines:
+                yield line
+
+        mock_httpx = Mock()
+        mock_response = MagicMock()
+        mock_response.aiter_lines = aiter_lines
+        mock_async_client = MagicMock()
+        mock_async_client.stream.return_value.__aenter__.return_value = mock_response
+        mock_httpx.AsyncClient.return_value = mock_async_client
+
+        with patch.dict("sys.modules", {"httpx": mock_httpx}):
+            provider = OllamaProvider()
+            chunks = [chunk async for chunk in provider.generate_response_stream("p")]
+
+        assert chunks == ["[{", "}]"]
+        assert mock_async_client.stream.call_args.kwargs["json"]["stream"] is True
+
+    @pytest.mark.asyncio
+    async def test_rejected_format_is_dropped_and_retried(self):
+        """Test that a 400 for the format field retries once without it and stops sending it."""
+        rejected = Exception("400 Bad Request")
+        rejected.response = Mock(status_code=400)
+        ok_response = MagicMock()
+        ok_response.json.return_value = {"response": "{}"}
+        mock_async_client = MagicMock()
+        mock_async_client.post = AsyncMock(side_effect=[rejected, ok_response, ok_response])
+        mock_httpx = Mock()
+        mock_httpx.AsyncClient.return_value = mock_async_client
+
+        with patch.dict("sys.modules", {"httpx": mock_httpx}):
+            provider = OllamaProvider(response_format={"type": "object"})
+            first = await provider.generate_response("p")
+            await provider.generate_response("p")
+
+        assert first == "{}"
+        bodies = [call.kwargs["json"] for call in mock_async_client.post.call_args_list]
+        assert bodies[0]["format"] == {"type": "object"}
+        assert "format" not in bodies[1]
+        assert "format" not in bodies[2]
+
+    @pytest.mark.asyncio
+    async def test_injected_async_client_is_used_and_left_open(self):
+        """Test that a caller-owned streaming client is reused and not closed."""
+        shared = MagicMock()
+        shared.aclose = AsyncMock()
+
+        with patch.dict("sys.modules", {"httpx": Mock()}):
+            provider = OllamaProvider(async_client=shared)
+            assert await provider._get_async_client() is shared
+            await provider.aclose()
+
+        shared.aclose.assert_not_awaited()
+
+    def test_async_client_from_previous_loop_is_closed(self):
+        """Test that reusing the provider from a new event loop closes the old streaming client."""
+        clients = [MagicMock(), MagicMock()]
+        for client in clients:
+            client.aclose = AsyncMock()
+        mock_httpx = Mock()
+        mock_httpx.AsyncClient.side_effect = clients
+
+        with patch.dict("sys.modules", {"httpx": mock_httpx}):
+            provider = OllamaProvider()
+            asyncio.run(provider._get_async_client())
+            assert asyncio.run(provider._get_async_client()) is clients[1]
+
+        clients[0].aclose.assert_awaited_once()
+        clients[1].aclose.assert_not_awaited()
+
 
 class TestGeminiProvider:
     """Test GeminiProvider functionality."""
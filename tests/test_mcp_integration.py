@@ -0,0 +1,172 @@
+"""Tests for the MCP client integration."""
+
+import asyncio
+from unittest.mock import patch
+
+import pytest
+from mcp.client import stdio
+
+from shardguard.core.mcp_integration import (
+    InProcessMCPClient,
+    MCPClient,
+    MCPConnectionError,
+    _ServerConnection,
+    create_mcp_client,
+)
+
+
+class TestCreateMCPClient:
+    """Test selecting the MCP client transport."""
+
+    def test_defaults_to_subprocess_client(self):
+        """Test that servers run as subprocesses unless asked otherwise."""
+        with patch.dict("os.environ", {}, clear=True):
+            client = create_mcp_client()
+
+        assert type(client) is MCPClient
+
+    def test_env_var_selects_in_process_client(self):
+        """Test that SHARDGUARD_INPROC_MCP=1 selects the in-process servers."""
+        with patch.dict("os.environ", {"SHARDGUARD_INPROC_MCP": "1"}):
+            client = create_mcp_client()
+
+        assert isinstance(client, InProcessMCPClient)
+
+
+class TestInProcessMCPClient:
+    """Test the in-process MCP transport against the bundled servers."""
+
+    @pytest.mark.asyncio
+    async def test_lists_and_calls_tools_without_subprocesses(self):
+        """Test that tools are listed and called through in-memory sessions."""
+        client = InProcessMCPClient()
+        with patch("shardguard.core.mcp_integration.stdio_client") as mock_stdio:
+            try:
+                tools = await client.list_tools("file-server")
+                result = await client.call_tool(
+                    "file-server", "read_file", {"path": "notes.txt"}
+                )
+            finally:
+                await client.aclose()
+
+        assert {tool.name for tool in tools["file-server"]} == {
+            "read_file",
+            "write_file",
+            "list_directory",
+        }
+        assert result == "[FILE PoC] Would read file: notes.txt"
+        mock_stdio.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_tools_description_reuses_formatted_schemas(self):
+        """Test that unchanged input schemas are formatted only once."""
+        from shardguard.core import mcp_integration
+
+        client = InProcessMCPClient()
+        with patch.object(
+            mcp_integration,
+            "_format_input_schema",
+            wraps=mcp_integration._format_input_schema,
+        ) as mock_format:
+            try:
+                first = await client.get_tools_description()
+                calls_after_first = mock_format.call_count
+                second = await client.get_tools_description()
+            finally:
+                await client.aclose()
+
+        assert first == second
+        assert "    - path: Path to the file to read (required)\n" in first
+        assert calls_after_first > 0
+        assert mock_format.call_count == calls_after_first
+
+
+class TestServerConnection:
+    """Test running operations on a pooled server connection."""
+
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_cancels_operation(self):
+        """Test that cancelling a caller waiting on run() also cancels its operation."""
+        started = asyncio.Event()
+        cancelled = asyncio.Event()
+
+        async def operation(session):
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        connection = _ServerConnection(None)
+        connection._task = asyncio.get_running_loop().create_future()
+        caller = asyncio.create_task(connection.run(operation))
+        await started.wait()
+        caller.cancel()
+
+        with pytest.raises(asyncio.CancelledError):
+            await caller
+        await asyncio.wait_for(cancelled.wait(), 1)
+
+
+class TestMCPClientReconnect:
+    """Test that pooled sessions notice when their server exits."""
+
+    @pytest.fixture
+    def processes(self):
+        """Record every server subprocess the client spawns."""
+        spawned = []
+        create_process = stdio._create_platform_compatible_process
+
+        async def record_process(*args, **kwargs):
+            process = await create_process(*args, **kwargs)
+            spawned.append(process)
+            return process
+
+        with patch.object(
+            stdio, "_create_platform_compatible_process", side_effect=record_process
+        ):
+            yield spawned
+
+    @pytest.mark.asyncio
+    async def test_killed_server_is_respawned(self, processes):
+        """Test that a dead server ends its session and the next call respawns it."""
+        client = MCPClient()
+        try:
+            await client.list_tools("file-server")
+            connection = client._connections["file-server"]
+            processes[0].kill()
+            await asyncio.wait([connection._task], timeout=10)
+            assert not connection.alive
+
+            result = await client.call_tool(
+                "file-server", "read_file", {"path": "notes.txt"}
+            )
+        finally:
+            await client.aclose()
+
+        assert result == "[FILE PoC] Would read file: notes.txt"
+        assert len(processes) == 2
+
+    @pytest.mark.asyncio
+    async def test_lost_call_raises_and_listing_retries(self, processes):
+        """Test that a call lost with its server raises while listing reconnects."""
+        client = MCPClient()
+        try:
+            await client.list_tools("file-server")
+            processes[0].kill()
+            with pytest.raises(MCPConnectionError):
+                await client.call_tool("file-server", "read_file", {"path": "a"})
+
+            await client.list_tools("file-server")
+            processes[1].kill()
+            tools = await client.list_tools("file-server")
+        finally:
+            await client.aclose()
+
+        assert {tool.name for tool in tools["file-server"]} == {
+            "read_file",
+            "write_file",
+            "list_directory",
+        }
+        assert len(processes) == 3
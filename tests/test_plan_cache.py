@@ -0,0 +1,125 @@
+"""Tests for ShardGuard plan caches."""
+
+from unittest.mock import patch
+
+import pytest
+
+from shardguard.core.plan_cache import (
+    DEFAULT_PLAN_TTL,
+    FilePlanCache,
+    InMemoryPlanCache,
+    plan_cache_key,
+)
+
+
+class TestPlanCacheKey:
+    """Test cases for plan_cache_key."""
+
+    def test_key_depends_on_model_and_prompt(self):
+        """Test that keys differ by model and by prompt but are stable."""
+        key = plan_cache_key("llama3.2", "read a file")
+        assert key == plan_cache_key("llama3.2", "read a file")
+        assert key != plan_cache_key("gemini-2.0-flash-exp", "read a file")
+        assert key != plan_cache_key("llama3.2", "write a file")
+        assert key != plan_cache_key("llama3.2", "read a file", base_url="http://other:11434")
+
+
+class TestInMemoryPlanCache:
+    """Test cases for InMemoryPlanCache."""
+
+    @pytest.mark.asyncio
+    async def test_get_returns_stored_value(self):
+        """Test a simple round trip and a miss."""
+        cache = InMemoryPlanCache()
+        await cache.set("k", '{"plan": 1}')
+        assert await cache.get("k") == '{"plan": 1}'
+        assert await cache.get("missing") is None
+
+    @pytest.mark.asyncio
+    async def test_evicts_least_recently_used(self):
+        """Test that the oldest untouched entry is dropped when full."""
+        cache = InMemoryPlanCache(max_entries=2)
+        await cache.set("a", "1")
+        await cache.set("b", "2")
+        await cache.get("a")
+        await cache.set("c", "3")
+
+        assert await cache.get("a") == "1"
+        assert await cache.get("b") is None
+        assert await cache.get("c") == "3"
+
+    @pytest.mark.asyncio
+    async def test_entries_expire_after_ttl(self):
+        """Test that entries are not returned once their ttl has passed."""
+        cache = InMemoryPlanCache()
+        with patch("shardguard.core.plan_cache.time.monotonic", return_value=100.0):
+            await cache.set("k", "v", ttl=5)
+        with patch("shardguard.core.plan_cache.time.monotonic", return_value=104.0):
+            assert await cache.get("k") == "v"
+        with patch("shardguard.core.plan_cache.time.monotonic", return_value=105.0):
+            assert await cache.get("k") is None
+
+    @pytest.mark.asyncio
+    async def test_entries_expire_by_default(self):
+        """Test that without an explicit ttl entries still expire after DEFAULT_PLAN_TTL."""
+        cache = InMemoryPlanCache()
+        with patch("shardguard.core.plan_cache.time.monotonic", return_value=100.0):
+            await cache.set("k", "v")
+        with patch("shardguard.core.plan_cache.time.monotonic", return_value=100.0 + DEFAULT_PLAN_TTL):
+            assert await cache.get("k") is None
+
+    @pytest.mark.asyncio
+    async def test_delete_and_clear_evict_entries(self):
+        """Test that entries can be evicted one at a time or all at once."""
+        cache = InMemoryPlanCache()
+        await cache.set("a", "1")
+        await cache.set("b", "2")
+
+        await cache.delete("a")
+        assert await cache.get("a") is None
+        assert await cache.get("b") == "2"
+
+        await cache.clear()
+        assert await cache.get("b") is None
+
+
+class TestFilePlanCache:
+    """Test cases for FilePlanCache."""
+
+    @pytest.mark.asyncio
+    async def test_round_trip_survives_new_instance(self, tmp_path):
+        """Test that a stored plan is read back by a fresh cache on the same directory."""
+        await FilePlanCache(tmp_path / "plans").set("k", '{"plan": 1}')
+
+        cache = FilePlanCache(tmp_path / "plans")
+        assert await cache.get("k") == '{"plan": 1}'
+        assert await cache.get("missing") is None
+        assert [p.name for p in (tmp_path / "plans").iterdir()] == ["k.json"]
+
+    @pytest.mark.asyncio
+    async def test_entries_expire_after_ttl(self, tmp_path):
+        """Test that files older than the ttl are treated as misses and removed."""
+        cache = FilePlanCache(tmp_path, ttl=5)
+        await cache.set("k", "v")
+        mtime = (tmp_path / "k.json").stat().st_mtime
+
+        with patch("shardguard.core.plan_cache.time.time", return_value=mtime + 4):
+            assert await cache.get("k") == "v"
+        with patch("shardguard.core.plan_cache.time.time", return_value=mtime + 5):
+            assert await cache.get("k") is None
+        assert not (tmp_path / "k.json").exists()
+
+    @pytest.mark.asyncio
+    async def test_delete_and_clear_evict_entries(self, tmp_path):
+        """Test that entries can be evicted one at a time or all at once."""
+        cache = FilePlanCache(tmp_path)
+        for key in ("a", "b", "c"):
+            await cache.set(key, key)
+
+        await cache.delete("a")
+        await cache.delete("missing")
+        assert await cache.get("a") is None
+        assert await cache.get("b") == "b"
+
+        await cache.clear()
+        assert list(tmp_path.iterdir()) == []
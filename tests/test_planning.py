@@ -1,9 +1,11 @@
 """Tests for ShardGuard planning functionality."""
 
-from unittest.mock import patch
+import json
+from unittest.mock import AsyncMock, patch
 
 import pytest
 
+from shardguard.core.llm_providers import FallbackResponse, OllamaProvider
 from shardguard.core.planning import PlanningLLM
 
 
@@ -67,22 +69,135 @@ class TestPlanningLLM:
         assert llm.base_url == expected_url
 
     @pytest.mark.asyncio
-    @patch("shardguard.core.llm_providers.OllamaProvider.generate_response")
     @patch("shardguard.core.mcp_integration.MCPClient.get_tools_description")
-    async def test_generate_plan_success(self, mock_get_tools, mock_generate):
+    async def test_generate_plan_success(self, mock_get_tools):
         """Test successful plan generation."""
         # Mock tools description
         mock_get_tools.return_value = "Available MCP Tools:\n\nServer: file-operations"
 
         # Mock LLM response
         expected_response = '{"original_prompt": "test prompt", "sub_prompts": [{"id": 1, "content": "async subtask", "opaque_values": {}}]}'
-        mock_generate.return_value = expected_response
+        prompts = []
 
-        llm = PlanningLLM()
-        result = await llm.generate_plan("test prompt")
+        async def fake_stream(self, prompt):
+            prompts.append(prompt)
+            yield expected_response
+
+        with patch.object(OllamaProvider, "generate_response_stream", fake_stream):
+            llm = PlanningLLM()
+            result = await llm.generate_plan("test prompt")
 
         assert result == expected_response
-        mock_generate.assert_called_once()
+        assert len(prompts) == 1
+
+    @pytest.mark.asyncio
+    @patch("shardguard.core.mcp_integration.MCPClient.get_tools_description")
+    async def test_generate_plan_stops_streaming_at_complete_plan(self, mock_get_tools):
+        """Test that the stream is closed as soon as a complete plan object arrives."""
+        mock_get_tools.return_value = "No MCP tools available."
+        closed = []
+
+        async def fake_stream(self, prompt):
+            try:
+                yield 'Sure! {"original_prompt": "p", '
+                yield '"sub_prompts": [{"content": "say \\"}\\""}]}'
+                yield " and some trailing prose"
+                raise AssertionError("stream read past the complete plan")
+            finally:
+                closed.append(True)
+
+        with patch.object(OllamaProvider, "generate_response_stream", fake_stream):
+            result = await PlanningLLM().generate_plan("p")
+
+        assert result == '{"original_prompt": "p", "sub_prompts": [{"content": "say \\"}\\""}]}'
+        assert closed == [True]
+
+    @pytest.mark.asyncio
+    @patch("shardguard.core.mcp_integration.MCPClient.get_tools_description")
+    async def test_generate_plan_marks_fallback_plans(self, mock_get_tools):
+        """Test that plans made up after a failed or unreachable model are marked as fallbacks."""
+        mock_get_tools.return_value = "No MCP tools available."
+
+        async def failing_stream(self, prompt):
+            raise RuntimeError("connection refused")
+            yield
+
+        async def mock_stream(self, prompt):
+            yield self._mock_response(prompt, error="connection refused")
+
+        for fake_stream in (failing_stream, mock_stream):
+            with patch.object(OllamaProvider, "generate_response_stream", fake_stream):
+                result = await PlanningLLM().generate_plan("p")
+
+            assert isinstance(result, FallbackResponse)
+            assert "connection refused" in json.loads(result)["sub_prompts"][0]["content"]
+
+    @pytest.mark.asyncio
+    @patch("shardguard.core.mcp_integration.MCPClient.get_tools_description")
+    async def test_tools_description_is_cached(self, mock_get_tools):
+        """Test that the tools description is fetched once until refreshed."""
+        mock_get_tools.return_value = "Available MCP Tools:\n\nServer: file-server"
+
+        llm = PlanningLLM()
+        first = await llm.get_available_tools_description()
+        second = await llm.get_available_tools_description()
+
+        assert first == second
+        mock_get_tools.assert_called_once()
+
+        await llm.get_available_tools_description(refresh=True)
+        assert mock_get_tools.call_count == 2
+
+    @pytest.mark.asyncio
+    @patch("shardguard.core.mcp_integration.MCPClient.get_tools_description")
+    async def test_generate_plan_reuses_tools_description(self, mock_get_tools):
+        """Test that consecutive plans list the MCP servers once until invalidated."""
+        mock_get_tools.return_value = "Available MCP Tools:\n\nServer: file-server"
+
+        async def fake_stream(self, prompt):
+            yield '{"original_prompt": "p", "sub_prompts": []}'
+
+        with patch.object(OllamaProvider, "generate_response_stream", fake_stream):
+            llm = PlanningLLM()
+            await llm.generate_plan("first")
+            await llm.generate_plan("second")
+            mock_get_tools.assert_called_once()
+
+            llm.invalidate_tools_cache()
+            await llm.generate_plan("third")
+        assert mock_get_tools.call_count == 2
+
+    @pytest.mark.asyncio
+    @patch("shardguard.core.mcp_integration.MCPClient.get_tools_description")
+    async def test_generate_plan_many_keeps_prompt_order(self, mock_get_tools):
+        """Test that batched plans come back in prompt order with one tools lookup."""
+        mock_get_tools.return_value = "No MCP tools available."
+
+        async def fake_stream(self, prompt):
+            yield f'{{"original_prompt": "{prompt}", "sub_prompts": []}}'
+
+        with patch.object(OllamaProvider, "generate_response_stream", fake_stream):
+            plans = await PlanningLLM().generate_plan_many(["a", "b", "c"])
+
+        assert [json.loads(plan)["original_prompt"] for plan in plans] == ["a", "b", "c"]
+        mock_get_tools.assert_called_once()
+
+    def test_ollama_planner_requests_plan_schema_format(self):
+        """Test that the Ollama planner constrains decoding to the plan schema."""
+        from shardguard.core.schemas import PLANNING_LLM_SCHEMA
+
+        llm = PlanningLLM()
+
+        assert llm.llm_provider._request_body("p", stream=True)["format"] == PLANNING_LLM_SCHEMA
+
+    @pytest.mark.asyncio
+    async def test_shared_client_is_passed_to_ollama(self):
+        """Test that an injected async client is used by the Ollama provider."""
+        shared = object()
+
+        llm = PlanningLLM(shared_client=shared)
+
+        assert await llm.llm_provider._get_async_client() is shared
 
     def test_extract_json_from_response(self):
         """Test JSON extraction from LLM response."""
@@ -98,6 +213,20 @@ class TestPlanningLLM:
         result = llm._extract_json_from_response(response_without_json)
         assert result == response_without_json
 
+    @pytest.mark.parametrize(
+        "response, expected",
+        [
+            ('Plan: {"a": {"b": "}"}} trailing }', '{"a": {"b": "}"}}'),
+            ('{"quote": "say \\"{hi\\"", "n": 1}', '{"quote": "say \\"{hi\\"", "n": 1}'),
+            ('{not json} then {"key": "value"}', '{"key": "value"}'),
+            ('{"first": 1} and {"second": 2}', '{"first": 1}'),
+            ('\n  {"plan": {"id": 1}}\n', '{"plan": {"id": 1}}'),
+        ],
+    )
+    def test_extract_json_from_response_balances_braces(self, response, expected):
+        """Test that the first balanced, parseable object is returned."""
+        assert PlanningLLM()._extract_json_from_response(response) == expected
+
     @pytest.mark.asyncio
     async def test_context_managers(self):
         """Test context manager functionality."""
@@ -105,6 +234,19 @@ class TestPlanningLLM:
         async with PlanningLLM() as llm:
             assert isinstance(llm, PlanningLLM)
 
+    @pytest.mark.asyncio
+    async def test_aclose_closes_provider_async_client(self):
+        """Test that closing the planner also closes the provider's async client."""
+        llm = PlanningLLM()
+        with (
+            patch.object(llm.mcp_client, "aclose", new=AsyncMock()) as mock_mcp_close,
+            patch.object(llm.llm_provider, "aclose", new=AsyncMock()) as mock_provider_close,
+        ):
+            await llm.aclose()
+
+        mock_mcp_close.assert_awaited_once()
+        mock_provider_close.assert_awaited_once()
+
 
 class TestPlanningLLMConstructor:
     """Test cases for PlanningLLM constructor with different providers."""
@@ -0,0 +1,44 @@
+"""Tests for ShardGuard PII redaction."""
+
+from pathlib import Path
+
+import pytest
+
+from shardguard.utils.redaction import Redactor
+
+RULES_FILE = Path(__file__).resolve().parent.parent / "src" / "shardguard" / "utils" / "rules.yaml"
+
+
+class TestRedactor:
+    """Test cases for Redactor."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.redactor = Redactor(str(RULES_FILE))
+
+    @pytest.mark.parametrize(
+        "text",
+        [
+            "hello world",
+            "Mail BOB@Example.com please",
+            "call 555-123-4567",
+            "host 192.168.1.1",
+            "due 2024-01-01",
+            "plain words only",
+        ],
+    )
+    def test_may_match_agrees_with_rules(self, text):
+        """Test that the combined prefilter matches exactly when some rule does."""
+        expected = any(rule["pattern"].search(text) for rule in self.redactor.rules)
+        assert self.redactor.may_match(text) is expected
+
+    def test_redact_leaves_clean_text_untouched(self):
+        """Test that text without sensitive values comes back unchanged."""
+        assert self.redactor.redact("nothing to hide here") == "nothing to hide here"
+
+    def test_redact_pseudonymizes_email(self):
+        """Test that an email address is replaced by a stable pseudonym."""
+        redacted = self.redactor.redact("write to bob@example.com")
+
+        assert "bob@example.com" not in redacted
+        assert redacted.startswith("write to <EMAIL:")
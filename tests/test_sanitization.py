@@ -75,3 +75,10 @@ class TestInputSanitizer:
             assert result.sanitized_input == expected_output
             for change in expected_changes:
                 assert any(change in c.lower() for c in result.changes_made)
+
+    def test_sanitize_removes_control_characters(self):
+        """Test that dangerous control characters are dropped and reported."""
+        result = self.sanitizer.sanitize("Hello\x00\x07\x7fworld", show_progress=False)
+
+        assert result.sanitized_input == "Helloworld"
+        assert any("control characters" in c for c in result.changes_made)
@@ -0,0 +1,59 @@
+"""Tests for ShardGuard JSON serialization helpers."""
+
+import json
+
+import pytest
+
+from shardguard.utils import serialization
+
+DOC = {"original_prompt": "héllo", "sub_prompts": [{"id": 1, "suggested_tools": []}]}
+
+
+@pytest.fixture(params=["orjson", "json"])
+def backend(request, monkeypatch):
+    """Run each test with orjson (when installed) and with the stdlib fallback."""
+    if request.param == "json":
+        monkeypatch.setattr(serialization, "orjson", None)
+    elif serialization.orjson is None:
+        pytest.skip("orjson not installed")
+    return request.param
+
+
+def test_dumps_indented_matches_stdlib(backend):
+    """Test that indented output is identical whichever backend is used."""
+    assert serialization.dumps(DOC, indent=True) == json.dumps(DOC, indent=2, ensure_ascii=False)
+
+
+def test_loads_round_trip(backend):
+    """Test that dumps output parses back to the same document."""
+    assert serialization.loads(serialization.dumps(DOC)) == DOC
+
+
+def test_loads_invalid_raises_decode_error(backend):
+    """Test that invalid JSON raises json.JSONDecodeError on both backends."""
+    with pytest.raises(json.JSONDecodeError):
+        serialization.loads("[{")
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ('{"key": "value"}', '{"key": "value"}'),
+        ('Plan: {"a": {"b": "}"}} trailing }', '{"a": {"b": "}"}}'),
+        ('{not json} then {"key": "value"}', '{"key": "value"}'),
+        ("no object here", None),
+        ('{"never": "closed"', None),
+    ],
+)
+def test_find_json_object(backend, text, expected):
+    """Test that the first balanced, parseable object is found."""
+    assert serialization.find_json_object(text) == expected
+
+
+def test_scanner_reports_object_once_complete(backend):
+    """Test that the streaming scanner only reports an object after its closing brace."""
+    scanner = serialization.JSONObjectScanner()
+
+    assert scanner.feed('prose {"a": "\\"}') is None
+    assert scanner.feed('", "b": [1]') is None
+    assert scanner.feed("} more") == '{"a": "\\"}", "b": [1]}'